@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""Compare BinaryFileHandler throughput with a formatted text log.
+
+Each benchmark logs *records* INFO messages with two arguments through a
+logger with a single buffered file handler (default file: /dev/null, so
+the numbers reflect per-record overhead rather than disk speed).
+"""
+import logging
+import os
+
+import cli.app
+from cli.log import BinaryFileHandler, BufferedFileHandler, FastFormatter
+from cli.profiler import Profiler
+
+@cli.app.CommandLineApp
+def bench_binlog(app):
+    records = app.params.records
+    profiler = Profiler(stdout=app.stdout, anonymous=True, count=1,
+        repeat=app.params.repeat)
+
+    def run(handler):
+        log = logging.Logger("bench")
+        log.addHandler(handler)
+        for i in xrange(records):
+            log.info("record %d of %s", i, "bench")
+        handler.close()
+
+    @profiler.statistical
+    def text():
+        handler = BufferedFileHandler(app.params.output)
+        handler.setFormatter(FastFormatter("%(asctime)s %(message)s"))
+        run(handler)
+
+    @profiler.statistical
+    def binary():
+        run(BinaryFileHandler(app.params.output))
+
+bench_binlog.add_param("-n", "--records", default=10**5, type=int,
+    help="records logged per run")
+bench_binlog.add_param("-r", "--repeat", default=3, type=int,
+    help="runs per benchmark")
+bench_binlog.add_param("-o", "--output", default=os.devnull,
+    help="file to log to")
+
+if __name__ == "__main__":
+    bench_binlog.run()
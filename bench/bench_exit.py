@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""Measure GC policies and fast exit on a large-heap workload.
+
+Each variant runs in a fresh interpreter that builds *objects* small
+dictionaries during main and then exits. The reported time is the wall
+clock time of the whole child process, so it includes the interpreter's
+teardown.
+"""
+import subprocess
+import sys
+
+import cli.app
+
+try:
+    from time import perf_counter as timer
+except ImportError:
+    from time import time as timer
+
+variants = [
+    ("default", []),
+    ("gc_policy=disable", ["--gc-policy", "disable"]),
+    ("gc_policy=freeze", ["--gc-policy", "freeze"]),
+    ("fast_exit", ["--fast-exit"]),
+    ("gc_policy=disable, fast_exit", ["--gc-policy", "disable", "--fast-exit"]),
+]
+
+def heap(app):
+    app.heap = [{"i": i, "s": str(i)} for i in range(app.params.objects)]
+
+@cli.app.CommandLineApp
+def bench_exit(app):
+    if app.params.child:
+        child = cli.app.CommandLineApp(heap, argv=[app.argv[0]] + app.argv[2:],
+            gc_policy=app.params.gc_policy, fast_exit=app.params.fast_exit)
+        child.add_param("-n", "--objects", type=int)
+        child.add_param("--gc-policy")
+        child.add_param("--fast-exit", action="store_true")
+        child.run()
+
+    for name, args in variants:
+        best = None
+        for i in range(app.params.repeat):
+            started = timer()
+            subprocess.check_call([sys.executable, __file__, "--child",
+                "-n", str(app.params.objects)] + args)
+            elapsed = timer() - started
+            best = min(best is None and elapsed or best, elapsed)
+        app.stdout.write("%-32s best of %d: %.3f s\n" % (
+            name, app.params.repeat, best))
+
+bench_exit.add_param("--child", action="store_true", help="run the workload")
+bench_exit.add_param("-n", "--objects", default=2 * 10**6, type=int,
+    help="objects allocated by the workload")
+bench_exit.add_param("-r", "--repeat", default=3, type=int,
+    help="runs per variant")
+bench_exit.add_param("--gc-policy", help=cli.app.argparse.SUPPRESS)
+bench_exit.add_param("--fast-exit", action="store_true",
+    help=cli.app.argparse.SUPPRESS)
+
+if __name__ == "__main__":
+    bench_exit.run()
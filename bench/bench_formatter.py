@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""Compare FastFormatter throughput with logging.Formatter.
+
+Each benchmark formats *records* records with LoggingMixin's default
+message and date formats and reports the best run; records/second is
+printed afterwards.
+"""
+import logging
+
+import cli.app
+from cli.log import FastFormatter
+from cli.profiler import Profiler
+
+@cli.app.CommandLineApp
+def bench_formatter(app):
+    records = app.params.records
+    profiler = Profiler(stdout=app.stdout, anonymous=True, count=1,
+        repeat=app.params.repeat)
+    fmt = app.params.format
+    datefmt = app.params.date_format
+    record = logging.LogRecord("bench", logging.INFO, __file__, 1,
+        "record %d", (1,), None)
+
+    for cls in (logging.Formatter, FastFormatter):
+        format = cls(fmt, datefmt).format
+        def bench():
+            for i in xrange(records):
+                format(record)
+        bench.__name__ = cls.__name__
+        profiler.statistical(bench)
+        app.stdout.write(u"     %d records/s\n" % (records / profiler.result))
+
+bench_formatter.add_param("-n", "--records", default=10**5, type=int,
+    help="records formatted per run")
+bench_formatter.add_param("-r", "--repeat", default=3, type=int,
+    help="runs per benchmark")
+bench_formatter.add_param("-f", "--format", default="%(asctime)s %(message)s",
+    help="message format")
+bench_formatter.add_param("-d", "--date-format", default="%Y-%m-%dT%H:%M:%S",
+    help="date format")
+
+if __name__ == "__main__":
+    bench_formatter.run()
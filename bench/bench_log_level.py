@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""Measure the cost of logging calls below the logger's level.
+
+Each benchmark makes *calls* debug() calls on a logger set to WARNING,
+comparing a plain logging.Logger with CommandLineLogger, and an empty
+loop as the baseline.
+"""
+import logging
+
+import cli.app
+from cli.log import CommandLineLogger, Message, lazy
+from cli.profiler import Profiler
+
+@cli.app.CommandLineApp
+def bench_log_level(app):
+    calls = app.params.calls
+    profiler = Profiler(stdout=app.stdout, anonymous=True, count=1,
+        repeat=app.params.repeat)
+
+    plain = logging.Logger("plain", logging.WARNING)
+    fast = CommandLineLogger("fast", logging.WARNING)
+    for log in (plain, fast):
+        log.addHandler(logging.NullHandler())
+
+    @profiler.statistical
+    def baseline():
+        for i in xrange(calls):
+            pass
+
+    @profiler.statistical
+    def logger_debug():
+        debug = plain.debug
+        for i in xrange(calls):
+            debug("value %d", i)
+
+    @profiler.statistical
+    def commandlinelogger_debug():
+        debug = fast.debug
+        for i in xrange(calls):
+            debug("value %d", i)
+
+    @profiler.statistical
+    def commandlinelogger_debug_attribute():
+        for i in xrange(calls):
+            fast.debug("value %d", i)
+
+    @profiler.statistical
+    def commandlinelogger_lazy():
+        for i in xrange(calls):
+            fast.debug("value %s", lazy(str, i))
+
+    @profiler.statistical
+    def commandlinelogger_message():
+        for i in xrange(calls):
+            fast.debug(Message("value {0}", i))
+
+bench_log_level.add_param("-n", "--calls", default=10**6, type=int,
+    help="logging calls per run")
+bench_log_level.add_param("-r", "--repeat", default=3, type=int,
+    help="runs per benchmark")
+
+if __name__ == "__main__":
+    bench_log_level.run()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""Compare BufferedFileHandler throughput with the plain FileHandler.
+
+Each benchmark logs *records* INFO messages through a logger with a
+single file handler (default file: /dev/null, so the numbers reflect
+per-record overhead rather than disk speed).
+"""
+import logging
+import os
+
+import cli.app
+from cli.log import BufferedFileHandler, FileHandler, QueueHandler
+from cli.profiler import Profiler
+
+@cli.app.CommandLineApp
+def bench_logfile(app):
+    records = app.params.records
+    profiler = Profiler(stdout=app.stdout, anonymous=True, count=1,
+        repeat=app.params.repeat)
+
+    def logger(handler):
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        log = logging.Logger("bench")
+        log.addHandler(handler)
+        return log
+
+    @profiler.statistical
+    def file_handler():
+        log = logger(FileHandler(app.params.output))
+        for i in xrange(records):
+            log.info("record %d", i)
+
+    @profiler.statistical
+    def buffered_file_handler():
+        handler = BufferedFileHandler(app.params.output)
+        log = logger(handler)
+        for i in xrange(records):
+            log.info("record %d", i)
+        handler.close()
+
+    @profiler.statistical
+    def queued_buffered_file_handler():
+        handler = BufferedFileHandler(app.params.output)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        queue = QueueHandler(handler)
+        log = logging.Logger("bench")
+        log.addHandler(queue)
+        for i in xrange(records):
+            log.info("record %d", i)
+        queue.close()
+        handler.close()
+
+bench_logfile.add_param("-n", "--records", default=10**5, type=int,
+    help="records logged per run")
+bench_logfile.add_param("-r", "--repeat", default=3, type=int,
+    help="runs per benchmark")
+bench_logfile.add_param("-o", "--output", default=os.devnull,
+    help="file to log to")
+
+if __name__ == "__main__":
+    bench_logfile.run()
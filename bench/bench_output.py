@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""Compare OutputWriter throughput with plain print statements.
+
+Each benchmark writes *lines* short lines to a file (default:
+/dev/null, so the numbers reflect per-call overhead rather than disk
+speed).
+"""
+import os
+import sys
+
+import cli.app
+from cli.output import OutputWriter
+from cli.profiler import Profiler
+
+@cli.app.CommandLineApp
+def bench_output(app):
+    lines = app.params.lines
+    bufsize = -1
+    if app.params.unbuffered:
+        bufsize = 0
+    out = open(app.params.output, 'w', bufsize)
+    profiler = Profiler(stdout=app.stdout, anonymous=True, count=1,
+        repeat=app.params.repeat)
+
+    @profiler.statistical
+    def print_statement():
+        for i in xrange(lines):
+            print >>out, "line", i
+        out.flush()
+
+    @profiler.statistical
+    def file_write():
+        write = out.write
+        for i in xrange(lines):
+            write("line %d\n" % i)
+        out.flush()
+
+    @profiler.statistical
+    def output_writer():
+        writer = OutputWriter(out, policy="block")
+        write = writer.write
+        for i in xrange(lines):
+            write("line %d\n" % i)
+        writer.flush()
+
+    @profiler.statistical
+    def output_writer_line():
+        writer = OutputWriter(out, policy="line")
+        write = writer.write
+        for i in xrange(lines):
+            write("line %d\n" % i)
+        writer.flush()
+
+bench_output.add_param("-n", "--lines", default=10**6, type=int,
+    help="lines written per run")
+bench_output.add_param("-r", "--repeat", default=3, type=int,
+    help="runs per benchmark")
+bench_output.add_param("-u", "--unbuffered", default=False,
+    action="store_true", help="disable stdio buffering on the output file")
+bench_output.add_param("-o", "--output", default=os.devnull,
+    help="file to write to")
+
+if __name__ == "__main__":
+    bench_output.run()
@@ -27,9 +27,17 @@ __todo__ = """\
 """.split(" * ")
 
 import os
+import signal
 import sys
 
+try:
+    from time import perf_counter as timer
+except ImportError:
+    from time import time as timer
+
 from cli._ext import argparse
+from cli.output import OutputWriter, isbrokenpipe, silence
+from cli.progress import Progress
 from cli.util import ifelse, ismethodof
 
 __all__ = ["Application", "CommandLineApp", "CommandLineMixin"]
@@ -51,6 +59,30 @@ class Abort(Error):
         message = "Application terminated (%s)" % self.status
         super(Abort, self).__init__(message, self.status)
 
+class BrokenPipe(Abort):
+    """Raised when the reader of the application's output goes away.
+
+    The default status is the one a shell reports for a process killed
+    by :data:`signal.SIGPIPE`, which is what most command line tools do
+    when their output is piped to :command:`head`.
+
+    .. versionadded:: 1.1.2
+    """
+
+    def __init__(self, status=141):
+        super(BrokenPipe, self).__init__(status)
+
+class Timeout(Abort):
+    """Raised when :attr:`Application.main` runs past its deadline.
+
+    The default status matches that of the :command:`timeout` utility.
+
+    .. versionadded:: 1.1.2
+    """
+
+    def __init__(self, status=124):
+        super(Timeout, self).__init__(status)
+
 class Application(object):
     """An application.
     
@@ -98,6 +130,72 @@ class Application(object):
     propagated upwards by :attr:`post_run`; otherwise it will just
     cause :attr:`post_run` to exit with return code 1.
 
+    If *buffer_output* is True, :attr:`stdout` is wrapped in a
+    :class:`cli.output.OutputWriter`, which collects small writes and
+    passes them to the real stream in large batches (or a line at a
+    time if the stream is a terminal).
+
+    *stats* enables a report of the time spent in each phase of the
+    application (see :attr:`timings`) and the resources it used. The
+    report is written to :attr:`stderr` by :meth:`post_run`; *stats* may
+    be "text" (or True) or "json". The default, ``None``, disables the
+    report.
+
+    *gc_policy* controls the garbage collector while the application
+    runs: "disable" turns it off and "freeze" collects once and then
+    moves every object that survived :meth:`setup` out of the
+    collector's reach (where :func:`gc.freeze` is not available, this is
+    the same as "disable"). *gc_threshold* is a tuple passed to
+    :func:`gc.set_threshold` for the duration of the run. The previous
+    settings are restored by :meth:`post_run` unless the application
+    exits.
+
+    *cache* is a :class:`cli.cache.ResultCache` instance, or ``None``
+    (default). If not ``None``, :attr:`main` is only called when the
+    cache doesn't already hold its output for the current parameters and
+    input files.
+
+    *manifest* is a :class:`cli.manifest.Manifest` instance, or ``None``
+    (default). If not ``None``, :attr:`main` is skipped when the output
+    files are up to date with respect to the input files, as recorded in
+    the manifest after the last successful run.
+
+    *progress* is a :class:`cli.progress.Progress` instance, available to
+    :attr:`main` as :attr:`progress`. If *progress* is True, a
+    :class:`cli.progress.Progress` writing to :attr:`stderr` is created.
+    Otherwise (by default), :attr:`progress` still counts items but never
+    reports them.
+
+    *timeout* is the number of seconds :attr:`main` may run. When the
+    deadline passes, :attr:`main` is interrupted (using
+    :data:`signal.SIGALRM`, where available) and :meth:`post_run`
+    receives a :class:`Timeout` instance. :meth:`remaining` tells
+    :attr:`main` how much time it has left so that it can shed work as
+    the deadline approaches. Where the alarm can't be used (on Windows,
+    or when the application doesn't run in the main thread), the deadline
+    is only enforced cooperatively through :meth:`remaining`.
+
+    If *watch* is True, the application doesn't exit after :attr:`main`
+    returns. Instead, :meth:`post_run` waits for its input files (see
+    :meth:`watched_paths`) to change and then runs the application again
+    with the same :attr:`argv` (see :meth:`watch_changes`). *watch* may
+    also be a sequence of file and directory names to watch.
+
+    If *fast_exit* is True and :attr:`exit_after_main` is True,
+    :meth:`post_run` flushes :attr:`stdout`, :attr:`stderr` and any
+    logging handlers and then calls :func:`os._exit`, skipping the
+    interpreter's teardown (which can take seconds when the application
+    has built a large heap). :mod:`atexit` handlers do not run in that
+    case.
+
+    .. versionchanged:: 1.1.2
+        Added *buffer_output*, *stats*, *gc_policy*, *gc_threshold*,
+        *fast_exit*, *cache*, *manifest*, *progress*, *timeout* and
+        *watch*. If the reader of :attr:`stdout` goes away while
+        :attr:`main` is running, :meth:`run` now passes a
+        :class:`BrokenPipe` instance to :meth:`post_run` instead of a
+        traceback.
+
     In all but a very few cases, subclasses that override the constructor
     should call :meth:`Application.__init__` at the end of the
     overridden method to ensure that the :meth:`setup` method is
@@ -105,14 +203,30 @@ class Application(object):
     """
     main = None
 
+    timings = None
+    """A dictionary mapping the name of each phase of the application
+    ("setup", "pre_run", "main" and "post_run", plus any phases added by
+    mixins) to the number of seconds its most recent run took.
+    "post_run" is only measured when the *stats* report is enabled.
+
+    .. versionadded:: 1.1.2
+    """
+    phases = dict((v, i) for i, v in enumerate(
+        ("setup", "pre_run", "parse", "logging", "main", "post_run")))
+
     def __init__(self, main=None, name=None, exit_after_main=True, stdin=None, stdout=None,
             stderr=None, version=None, description=None, argv=None,
-            profiler=None, reraise=(Exception,), **kwargs):
+            profiler=None, reraise=(Exception,), buffer_output=False,
+            stats=None, gc_policy=None, gc_threshold=None, fast_exit=False,
+            cache=None, manifest=None, progress=None, timeout=None,
+            watch=None, **kwargs):
         self._name = name
         self.exit_after_main = exit_after_main
         self.stdin = stdin and stdin or sys.stdin
         self.stdout = stdout and stdout or sys.stdout
         self.stderr = stderr and stderr or sys.stderr
+        if buffer_output:
+            self.stdout = OutputWriter(self.stdout)
         self.version = version
         self.argv = argv
         if argv is None:
@@ -121,12 +235,38 @@ class Application(object):
 
         self.profiler = profiler
         self.reraise = reraise
+        if stats is True:
+            stats = "text"
+        self.stats = stats
+        self.timings = {}
+        if gc_policy not in (None, "disable", "freeze"):
+            raise ValueError("unknown gc policy: %r" % gc_policy)
+        self.gc_policy = gc_policy
+        self.gc_threshold = gc_threshold
+        self.gc_saved = None
+        self.fast_exit = fast_exit
+        self.cache = cache
+        self.manifest = manifest
+        if progress is True:
+            progress = Progress(stream=self.stderr)
+        elif not progress:
+            progress = Progress(stream=self.stderr, interactive=False,
+                signals=())
+        self.progress = progress
+        self.timeout = timeout
+        self.deadline = None
+        self.alarm_handler = None
+        self.watch_paths = None
+        if isinstance(watch, (list, tuple)):
+            self.watch_paths = watch
+        self.watch = bool(watch)
+        self.watching = False
         
         if main is not None:
             self.main = main
 
         if getattr(self, "main", None) is not None:
-            self.setup()
+            self.timed("setup", self.setup)
 
     def __call__(self, main):
         """Wrap the *main* callable and return an :class:`Application` instance.
@@ -144,7 +284,7 @@ class Application(object):
         """
         self.main = main
 
-        self.setup()
+        self.timed("setup", self.setup)
 
         return self
 
@@ -185,6 +325,198 @@ class Application(object):
         else:
             return getattr(self.main, "__doc__", "")
 
+    def timed(self, phase, func, *args):
+        """Call *func* with *args* and record its running time.
+
+        The number of seconds *func* took is stored in :attr:`timings`
+        under *phase*. Returns *func*'s return value.
+
+        .. versionadded:: 1.1.2
+        """
+        started = timer()
+        try:
+            return func(*args)
+        finally:
+            self.timings[phase] = timer() - started
+
+    def report_stats(self):
+        """Write the resource report to :attr:`stderr`.
+
+        The report contains :attr:`timings` and, where the :mod:`resource`
+        module is available, the peak resident set size, user and system
+        CPU time and context switch counts of the process. It is formatted
+        according to :attr:`stats`.
+
+        .. versionadded:: 1.1.2
+        """
+        stats = [("%s_time" % k, v) for k, v in sorted(self.timings.items(),
+            key=lambda item: self.phases.get(item[0], len(self.phases)))]
+        try:
+            import resource
+        except ImportError: # pragma: no cover
+            pass
+        else:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            maxrss = usage.ru_maxrss
+            # Linux reports kilobytes, BSD and OS X bytes.
+            if sys.platform == "darwin":
+                maxrss //= 1024
+            stats.extend([
+                ("maxrss_kb", maxrss),
+                ("user_time", usage.ru_utime),
+                ("system_time", usage.ru_stime),
+                ("voluntary_switches", usage.ru_nvcsw),
+                ("involuntary_switches", usage.ru_nivcsw),
+            ])
+
+        if self.stats == "json":
+            import json
+            self.stderr.write(u"%s\n" % json.dumps(dict(stats), sort_keys=True))
+        else:
+            for k, v in stats:
+                if isinstance(v, float):
+                    v = "%.6f" % v
+                self.stderr.write(u"%s: %s %s\n" % (self.name, k, v))
+
+    def apply_gc_policy(self):
+        """Configure the garbage collector for the run.
+
+        The current settings are saved so that :meth:`restore_gc_policy`
+        can put them back. See :class:`Application` for the meaning of
+        :attr:`gc_policy` and :attr:`gc_threshold`.
+
+        .. versionadded:: 1.1.2
+        """
+        if self.gc_policy is None and self.gc_threshold is None:
+            return
+        import gc
+        frozen = self.gc_policy == "freeze" and hasattr(gc, "freeze")
+        self.gc_saved = (gc.isenabled(), gc.get_threshold(), frozen)
+        if self.gc_threshold is not None:
+            gc.set_threshold(*self.gc_threshold)
+        if frozen:
+            gc.collect()
+            gc.freeze()
+        elif self.gc_policy is not None:
+            gc.collect()
+            gc.disable()
+
+    def restore_gc_policy(self):
+        """Undo :meth:`apply_gc_policy`.
+
+        .. versionadded:: 1.1.2
+        """
+        if self.gc_saved is None:
+            return
+        import gc
+        enabled, threshold, frozen = self.gc_saved
+        self.gc_saved = None
+        gc.set_threshold(*threshold)
+        # Leave alone objects that someone else froze.
+        if frozen:
+            gc.unfreeze()
+        if enabled:
+            gc.enable()
+
+    def start_deadline(self):
+        """Start the clock on :attr:`timeout`, if it is set.
+
+        .. versionadded:: 1.1.2
+        """
+        self.deadline = None
+        if not self.timeout:
+            return
+        self.deadline = timer() + self.timeout
+        if not hasattr(signal, "setitimer"): # pragma: no cover
+            return
+        try:
+            self.alarm_handler = signal.signal(signal.SIGALRM, self.expire)
+        except ValueError: # pragma: no cover
+            # Signals can only be handled in the main thread.
+            return
+        signal.setitimer(signal.ITIMER_REAL, self.timeout)
+
+    def cancel_deadline(self):
+        """Stop the alarm set by :meth:`start_deadline`.
+
+        .. versionadded:: 1.1.2
+        """
+        if self.alarm_handler is None:
+            return
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, self.alarm_handler)
+        self.alarm_handler = None
+
+    def expire(self, signum, frame):
+        raise Timeout()
+
+    def remaining(self):
+        """Return the number of seconds left before the deadline.
+
+        If there is no deadline, returns ``None``.
+
+        .. versionadded:: 1.1.2
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - timer(), 0.0)
+
+    def exit(self, status):
+        """Exit with *status*.
+
+        Normally this calls :func:`sys.exit`. If :attr:`fast_exit` is
+        True, output and logging handlers are flushed and the process
+        ends immediately with :func:`os._exit`.
+
+        .. versionadded:: 1.1.2
+        """
+        if not self.fast_exit:
+            sys.exit(status)
+        try:
+            self.flush()
+        except BrokenPipe:
+            pass
+        logging = sys.modules.get("logging")
+        if logging is not None:
+            logging.shutdown()
+        os._exit(status)
+
+    def flush(self):
+        """Flush :attr:`stdout` and :attr:`stderr`.
+
+        If the reader of either stream has gone away, the stream is
+        silenced (see :func:`cli.output.silence`) and :class:`BrokenPipe`
+        is raised.
+
+        .. versionadded:: 1.1.2
+        """
+        broken = False
+        for stream in (self.stdout, self.stderr):
+            flush = getattr(stream, "flush", None)
+            if flush is None:
+                continue
+            try:
+                flush()
+            except (IOError, OSError) as e:
+                if not isbrokenpipe(e):
+                    raise
+                silence(stream)
+                broken = True
+        if broken:
+            raise BrokenPipe()
+
+    def flush_quietly(self):
+        """Call :meth:`flush`, ignoring any errors.
+
+        This is for when another error is already on its way out.
+
+        .. versionadded:: 1.1.2
+        """
+        try:
+            self.flush()
+        except (IOError, OSError, BrokenPipe):
+            pass
+
     def pre_run(self):
         """Perform any last-minute configuration.
 
@@ -195,6 +527,18 @@ class Application(object):
         """
         pass
 
+    def handle_error(self, error):
+        """React to *error*, raised by :attr:`main`, before it propagates.
+
+        :meth:`run` calls this method just before it re-raises an
+        exception that matches :attr:`reraise` (in which case
+        :meth:`post_run` isn't called). The base implementation does
+        nothing.
+
+        .. versionadded:: 1.1.2
+        """
+        pass
+
     def post_run(self, returned):
         """Clean up after the application.
 
@@ -203,7 +547,15 @@ class Application(object):
         :meth:`post_run` decides whether to call :func:`sys.exit` (based on the
         value of the :attr:`exit_after_main` attribute) or pass the value back
         to :meth:`run`. Subclasses should probably preserve this behavior.
+
+        .. versionchanged:: 1.1.2
+            If :attr:`stats` is set, the resource report is written
+            (see :meth:`report_stats`). The application exits through
+            :meth:`exit`. If :attr:`watch`
+            is set, the application runs again whenever its inputs change
+            (see :meth:`watch_changes`).
         """
+        started = timer()
         # Interpret the returned value in the same way sys.exit() does.
         if returned is None:
             returned = 0
@@ -217,9 +569,16 @@ class Application(object):
                 returned = int(returned)
             except:
                 returned = 1
+
+        if self.stats:
+            self.timings["post_run"] = timer() - started
+            self.report_stats()
+
+        if self.watch and not self.watching:
+            returned = self.watch_changes(returned)
             
         if self.exit_after_main:
-            sys.exit(returned)
+            self.exit(returned)
         else:
             return returned
 
@@ -231,21 +590,277 @@ class Application(object):
         argument. The return value (or :class:`Exception` instance raised) is
         then passed to :meth:`post_run` which may modify it (or terminate the
         application entirely).
+
+        Output is flushed (see :meth:`flush`) before :meth:`post_run` is
+        called; if :attr:`main` raised an exception, errors while flushing
+        are ignored so that they don't hide it. A closed pipe on :attr:`stdout` is reported to
+        :meth:`post_run` as a :class:`BrokenPipe` instance, and an expired
+        deadline as a :class:`Timeout` instance, even if *reraise* would
+        otherwise propagate the error. Errors that do propagate are first
+        passed to :meth:`handle_error`. In watch mode (see
+        :meth:`watch_changes`), they are written to :attr:`stderr`
+        instead, and the run's status is 1.
+
+        The garbage collector settings (see :meth:`apply_gc_policy`) are
+        restored when :meth:`run` returns or raises.
+        """
+        self.apply_gc_policy()
+        try:
+            self.timed("pre_run", self.pre_run)
+
+            args = (self,)
+            if ismethodof(self.main, self):
+                args = ()
+            self.progress.start()
+            self.start_deadline()
+            flushed = False
+            try:
+                try:
+                    if self.manifest is not None:
+                        returned = self.timed("main", self.manifest.call,
+                            self, args)
+                    elif self.cache is not None:
+                        returned = self.timed("main", self.cache.call,
+                            self, args)
+                    else:
+                        returned = self.timed("main", self.main, *args)
+                finally:
+                    self.cancel_deadline()
+                    self.progress.stop()
+                flushed = True
+                self.flush()
+            except Exception as e:
+                if not flushed:
+                    self.flush_quietly()
+                if isinstance(e, (BrokenPipe, Timeout)):
+                    returned = e
+                elif isbrokenpipe(e):
+                    silence(self.stdout)
+                    returned = BrokenPipe()
+                elif isinstance(e, self.reraise):
+                    self.handle_error(e)
+                    if not (self.watch and not self.watching):
+                        # raising the last exception preserves traceback
+                        raise
+                    # Keep watching: fixing the error is what it's for.
+                    import traceback
+                    traceback.print_exc(file=self.stderr)
+                    returned = 1
+                else:
+                    returned = e
+
+            return self.post_run(returned)
+        finally:
+            self.restore_gc_policy()
+
+    def reset(self, argv):
+        """Prepare the application to run again with a new *argv*.
+
+        :meth:`run_many` calls :meth:`reset` before each run. Subclasses
+        should discard any state left over from the previous run here.
+
+        .. versionadded:: 1.1.2
         """
-        self.pre_run()
+        self.argv = argv
+
+    def run_many(self, entries):
+        """Run the application once for each entry in *entries*.
+
+        *entries* is an iterable of argument lists (not including the
+        program name, which is taken from :attr:`argv`). Entries may also
+        be strings, which are split like a shell command line; blank
+        strings and strings starting with '#' are skipped. This means that
+        an open file (or :attr:`stdin`) with one command line per line may
+        be passed directly.
+
+        The application is set up only once. Before each entry,
+        :meth:`reset` clears the state left by the previous run. Errors
+        are confined to the entry that caused them: :class:`Abort` and
+        :exc:`SystemExit` become that entry's status, and other exceptions
+        are written to :attr:`stderr` and counted as status 1.
+        :attr:`exit_after_main` is ignored while the entries are running.
+
+        Returns a list containing the exit status of each entry.
 
-        args = (self,)
-        if ismethodof(self.main, self):
-            args = ()
+        .. versionadded:: 1.1.2
+        """
+        argv = self.argv
+        exit_after_main = self.exit_after_main
+        self.exit_after_main = False
+        statuses = []
         try:
-            returned = self.main(*args)
-        except self.reraise:
-            # raising the last exception preserves traceback
-            raise
-        except Exception as e:
-            returned = e
+            for args in entries:
+                if isinstance(args, basestring):
+                    args = args.strip()
+                    if not args or args.startswith('#'):
+                        continue
+                    import shlex
+                    args = shlex.split(args)
+                self.reset([argv[0]] + list(args))
+                statuses.append(self.run_entry())
+        finally:
+            self.exit_after_main = exit_after_main
+            self.reset(argv)
+
+        return statuses
+
+    def run_commands(self, commands, jobs=None, prefix="[%(index)d] "):
+        """Run other programs, *jobs* at a time.
+
+        The commands' output is copied to :attr:`stdout` and
+        :attr:`stderr` a line at a time, each line starting with *prefix*.
+        Returns a list of :class:`cli.commands.CommandResult` instances
+        holding each command's status and running time. See
+        :func:`cli.commands.run_commands` for details.
+
+        .. versionadded:: 1.1.2
+        """
+        from cli.commands import run_commands
+        return run_commands(commands, jobs=jobs, stdout=self.stdout,
+            stderr=self.stderr, prefix=prefix)
+
+    def shell(self, prompt=None):
+        """Read command lines from :attr:`stdin` and run each one.
+
+        This is an interactive front end to :meth:`run_many`: the
+        application is set up once and every command runs in the same
+        process, so caches, connections and data loaded by earlier
+        commands are still there for later ones. Command line
+        applications parse each line with their existing
+        :attr:`argparser`; :attr:`main` can dispatch to subcommands
+        registered with :meth:`argparse.ArgumentParser.add_subparsers`.
+
+        When :attr:`stdin` is a terminal, *prompt* (by default, the
+        application's name followed by "> ") is shown before each line and
+        :mod:`readline` editing is enabled where available. Typing "exit",
+        "quit" or end-of-file leaves the shell. Interrupting a command
+        stops only that command.
+
+        Returns the exit status of the last command.
+
+        .. versionadded:: 1.1.2
+        """
+        if prompt is None:
+            prompt = "%s> " % self.name
+        isatty = getattr(self.stdin, "isatty", None)
+        interactive = callable(isatty) and isatty()
+        if interactive and self.stdin is sys.stdin:
+            try:
+                import readline
+            except ImportError: # pragma: no cover
+                pass
+
+        status = 0
+        while True:
+            try:
+                line = self.read_command(interactive and prompt or None)
+            except KeyboardInterrupt:
+                self.stderr.write("\n")
+                continue
+            except EOFError:
+                break
+            if line.strip() in ("exit", "quit"):
+                break
+            try:
+                statuses = self.run_many([line])
+            except KeyboardInterrupt:
+                self.stderr.write("\n")
+                statuses = [130]
+            if statuses:
+                status = statuses[0]
+
+        return status
+
+    def read_command(self, prompt=None):
+        """Return the next line from :attr:`stdin`, showing *prompt* first.
 
-        return self.post_run(returned)
+        Raises :exc:`EOFError` at the end of the input.
+
+        .. versionadded:: 1.1.2
+        """
+        if prompt is not None and self.stdin is sys.stdin and \
+                self.stdout is sys.stdout:
+            return raw_input(prompt)
+        if prompt is not None:
+            self.stdout.write(prompt)
+            self.stdout.flush()
+        line = self.stdin.readline()
+        if not line:
+            raise EOFError
+        return line
+
+    def run_entry(self):
+        """Call :meth:`run` and return its status, whatever happens.
+
+        .. versionadded:: 1.1.2
+        """
+        try:
+            return self.run()
+        except Abort as e:
+            return e.status
+        except SystemExit as e:
+            if e.code is None:
+                return 0
+            elif isinstance(e.code, int):
+                return e.code
+            return 1
+        except Exception:
+            import traceback
+            traceback.print_exc(file=self.stderr)
+            return 1
+
+    def watched_paths(self):
+        """Return the files and directories that :meth:`watch_changes` watches.
+
+        These are the paths passed as *watch* to the constructor or, by
+        default, the application's input files (see
+        :meth:`CommandLineMixin.input_paths`).
+
+        .. versionadded:: 1.1.2
+        """
+        if self.watch_paths is not None:
+            return list(self.watch_paths)
+        return getattr(self, "input_paths", lambda: [])()
+
+    def watch_changes(self, returned):
+        """Run the application again each time :meth:`watched_paths` change.
+
+        Each run starts from :meth:`reset` with the same :attr:`argv`, so
+        the parser built by :meth:`setup`, imported modules and anything
+        else the application keeps between runs stay warm. Bursts of
+        changes are collapsed into a single run (see
+        :class:`cli.watch.Watcher`). Watching stops when the user
+        interrupts the application; the status of the last run (or
+        *returned*, the status of the first one) is returned. Errors are
+        reported and confined to the run that caused them (see
+        :meth:`run_entry`), and the application's own output files (see
+        :meth:`CommandLineMixin.output_paths`) are not watched.
+
+        .. versionadded:: 1.1.2
+        """
+        paths = self.watched_paths()
+        if not paths:
+            self.stderr.write("%s: nothing to watch\n" % self.name)
+            return returned
+
+        from cli import watch
+        outputs = getattr(self, "output_paths", lambda: [])()
+        watcher = watch.watcher(paths, ignore=outputs)
+        exit_after_main = self.exit_after_main
+        self.exit_after_main = False
+        self.watching = True
+        try:
+            while True:
+                watcher.wait()
+                self.reset(self.argv)
+                returned = self.run_entry()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+            self.watching = False
+            self.exit_after_main = exit_after_main
+        return returned
 
 class ArgumentParser(argparse.ArgumentParser):
     """This subclass makes it easier to test ArgumentParser.
@@ -285,6 +900,21 @@ class ArgumentParser(argparse.ArgumentParser):
         """)
     del(get_prog, set_prog)
 
+    def add_subparsers(self, **kwargs):
+        """Subcommand parsers share :attr:`stdout` and :attr:`stderr`.
+
+        .. versionadded:: 1.1.2
+        """
+        if "parser_class" not in kwargs:
+            parent = self
+            def parser_class(**kw):
+                kw.setdefault("stdout", parent.stdout)
+                kw.setdefault("stderr", parent.stderr)
+                kw.setdefault("argv", parent.argv)
+                return type(parent)(**kw)
+            kwargs["parser_class"] = parser_class
+        return super(ArgumentParser, self).add_subparsers(**kwargs)
+
     def parse_known_args(self, args=None, namespace=None):
         """If *args* is None, use :attr:`argv`, not :data:`sys.argv`."""
         if args is None:
@@ -314,6 +944,53 @@ class ArgumentParser(argparse.ArgumentParser):
         self.print_usage(self.stderr)
         self.exit(2, u"%s: error: %s\n" % (self.prog, message))
 
+class Namespace(argparse.Namespace):
+    """A parameter namespace whose values may be converted on demand.
+
+    Values registered with :meth:`defer` are stored as they were given on
+    the command line. The conversion function runs (once) the first time
+    the attribute is read; assigning to the attribute cancels it.
+    Pending values are kept out of the instance's :attr:`__dict__`, so
+    :func:`vars` (and equality) only see values that have been converted.
+
+    .. versionadded:: 1.1.2
+    """
+    __slots__ = ("_lazy",)
+
+    def __init__(self, **kwargs):
+        object.__setattr__(self, "_lazy", {})
+        super(Namespace, self).__init__(**kwargs)
+
+    def defer(self, name, raw, convert):
+        """Store *raw* under *name* until it is read and passed to *convert*."""
+        self.__dict__.pop(name, None)
+        self._lazy[name] = (raw, convert)
+
+    def __getattr__(self, name):
+        if name == "_lazy":
+            raise AttributeError(name)
+        lazy = self._lazy
+        if name not in lazy:
+            raise AttributeError(name)
+        raw, convert = lazy[name]
+        value = convert(raw)
+        del lazy[name]
+        self.__dict__[name] = value
+        return value
+
+    def __setattr__(self, name, value):
+        self._lazy.pop(name, None)
+        self.__dict__[name] = value
+
+    def __contains__(self, key):
+        return key in self.__dict__ or key in self._lazy
+
+    def _get_kwargs(self):
+        # Report unconverted values as given, without converting them.
+        kwargs = dict(self.__dict__)
+        kwargs.update((k, raw) for k, (raw, _) in self._lazy.items())
+        return sorted(kwargs.items())
+
 class CommandLineMixin(object):
     """A command line application.
 
@@ -329,6 +1006,19 @@ class CommandLineMixin(object):
 
     *epilog* is text appended to the argument descriptions.
 
+    If *stats* is not ``None``, the :option:`--stats` parameter is added so
+    that users can ask for the resource report described in
+    :class:`Application`. In that case, the report is only written when
+    :option:`--stats` is given (optionally followed by "json").
+
+    If *timeout* is not ``None``, the :option:`--timeout` parameter is
+    added, with *timeout* as its default. It overrides the deadline
+    described in :class:`Application`; 0 means no deadline.
+
+    If *watch* is not ``None``, the :option:`--watch` parameter is added so
+    that users can ask for the watch mode described in
+    :class:`Application`.
+
     The rest of the arguments are passed to the :class:`Application`
     constructor.
     """
@@ -342,13 +1032,24 @@ class CommandLineMixin(object):
     Specifically, its an instance of :class:`argparse.Namespace`,
     but only the mapping of attributes to argument values should be
     relied upon.
+
+    .. versionchanged:: 1.1.2
+        :attr:`params` is a :class:`Namespace`, which supports lazily
+        converted parameters (see :meth:`add_param`).
     """
 
-    def __init__(self, usage=None, epilog=None, **kwargs):
+    def __init__(self, usage=None, epilog=None, stats=None, timeout=None,
+            watch=None, **kwargs):
         self.usage = usage
         self.epilog = epilog
+        self.stats_param = stats is not None
+        self.timeout_param = timeout is not None
+        self.watch_param = watch is not None
         self.actions = {}
-        self.params = argparse.Namespace()
+        self.inputs = []
+        self.outputs = []
+        self.lazy = {}
+        self.params = Namespace()
 
     def setup(self):
         """Configure the :class:`CommandLineMixin`.
@@ -376,6 +1077,20 @@ class CommandLineMixin(object):
                 version=("%%(prog)s %s" % self.version),
                 help=("show program's version number and exit"))
 
+        if self.stats_param:
+            self.add_param("--stats", nargs='?', const="text", default=None,
+                choices=("text", "json"),
+                help="report timings and resource usage on exit")
+
+        if self.timeout_param:
+            self.add_param("--timeout", default=self.timeout, type=float,
+                metavar="SECONDS",
+                help="give up after SECONDS (default: %(default)s)")
+
+        if self.watch_param:
+            self.add_param("--watch", default=self.watch, action="store_true",
+                help="run again whenever the input files change")
+
     def add_param(self, *args, **kwargs):
         """Add a parameter.
 
@@ -384,16 +1099,121 @@ class CommandLineMixin(object):
         parameter options in a dictionary. This information can be used
         later by other subclasses when deciding whether to override
         parameters.
+
+        If the *input* keyword argument is True, the parameter's values
+        are taken to be the names of files the application reads (see
+        :meth:`input_paths`); if *output* is True, they name files the
+        application writes (see :meth:`output_paths`).
+
+        If *lazy* is True, the *type* conversion is postponed until
+        :attr:`main` first reads the parameter from :attr:`params`, so
+        that expensive conversions (loading a configuration file, for
+        example) only happen when they're needed. Until then, the
+        parameter holds the string given on the command line (see
+        :meth:`Namespace._get_kwargs`). Conversion errors are reported
+        as the parser would have reported them. Lazy parameters should
+        not also have *choices*, which are checked before conversion.
+
+        .. versionchanged:: 1.1.2
+            Added *input*, *output* and *lazy*.
         """
+        input = kwargs.pop("input", False)
+        output = kwargs.pop("output", False)
+        convert = None
+        if kwargs.pop("lazy", False):
+            convert = kwargs.pop("type", None)
         action = self.argparser.add_argument(*args, **kwargs)
         self.actions[action.dest] = action
+        if input:
+            self.inputs.append(action.dest)
+        if output:
+            self.outputs.append(action.dest)
+        if convert is not None:
+            self.lazy[action.dest] = convert
         return action
 
+    def convert_param(self, dest, raw):
+        """Convert the lazy parameter *dest*'s *raw* value.
+
+        .. versionadded:: 1.1.2
+        """
+        action = self.actions[dest]
+        convert = self.lazy[dest]
+        def one(value):
+            try:
+                return convert(value)
+            except argparse.ArgumentTypeError as e:
+                message = str(e)
+            except (TypeError, ValueError):
+                name = getattr(convert, "__name__", repr(convert))
+                message = "invalid %s value: %r" % (name, value)
+            try:
+                self.argparser.error(
+                    str(argparse.ArgumentError(action, message)))
+            except SystemExit as e:
+                if self.exit_after_main:
+                    raise
+                raise Abort(e.code)
+
+        if isinstance(raw, list):
+            return [one(value) for value in raw]
+        return one(raw)
+
+    def defer_params(self, params):
+        """Register :attr:`lazy` parameters in *params* for later conversion.
+
+        Values that aren't strings (or lists of strings), like
+        non-string defaults, are left alone.
+
+        .. versionadded:: 1.1.2
+        """
+        for dest in self.lazy:
+            raw = params.__dict__.get(dest)
+            values = isinstance(raw, list) and raw or [raw]
+            if not values or \
+                    not all(isinstance(v, basestring) for v in values):
+                continue
+            convert = lambda raw, dest=dest: self.convert_param(dest, raw)
+            params.defer(dest, raw, convert)
+        return params
+
+    def param_paths(self, dests):
+        """Return the file names stored in the :attr:`params` in *dests*.
+
+        Parameters may hold a single name or a list of them; ``None`` and
+        "-" (standard input or output) are skipped.
+
+        .. versionadded:: 1.1.2
+        """
+        paths = []
+        for dest in dests:
+            value = getattr(self.params, dest, None)
+            if not isinstance(value, (list, tuple)):
+                value = [value]
+            paths.extend(v for v in value if v is not None and v != '-')
+        return paths
+
+    def input_paths(self):
+        """Return the names of the input files given on the command line.
+
+        .. versionadded:: 1.1.2
+        """
+        return self.param_paths(self.inputs)
+
+    def output_paths(self):
+        """Return the names of the output files given on the command line.
+
+        .. versionadded:: 1.1.2
+        """
+        return self.param_paths(self.outputs)
+
     def update_params(self, params, newparams):
         """Update a parameter namespace.
 
         The *params* instance will be updated with the names and values
-        from *newparams* and then returned.
+        from *newparams* and then returned. Parameters in *newparams*
+        that haven't been converted yet (see :class:`Namespace`) stay
+        that way if *params* is also a :class:`Namespace`.
 
         .. versionchanged:: 1.0.2
             :meth:`update_params` expects and returns
@@ -403,6 +1223,11 @@ class CommandLineMixin(object):
         """
         for k, v in vars(newparams).items():
             setattr(params, k, v)
+        for k, (raw, convert) in getattr(newparams, "_lazy", {}).items():
+            if isinstance(params, Namespace):
+                params.defer(k, raw, convert)
+            else:
+                setattr(params, k, convert(raw))
 
         return params
 
@@ -419,13 +1244,29 @@ class CommandLineMixin(object):
         :attr:`exit_after_main` is not True, raise Abort instead.
         """
         try:
-            ns = self.argparser.parse_args()
+            ns = self.timed("parse", self.argparser.parse_args,
+                None, Namespace())
         except SystemExit as e:
             if self.exit_after_main:
                 raise
             else:
                 raise Abort(e.code)
-        self.params = self.update_params(self.params, ns)
+        self.params = self.update_params(self.params, self.defer_params(ns))
+        if self.stats_param:
+            self.stats = self.params.stats
+        if self.timeout_param:
+            self.timeout = self.params.timeout
+        if self.watch_param:
+            self.watch = self.params.watch
+
+    def reset(self, argv):
+        """Point the parser at *argv* and start with empty :attr:`params`.
+
+        .. versionadded:: 1.1.2
+        """
+        self.argv = argv
+        self.argparser.argv = argv
+        self.params = Namespace()
 
 class CommandLineApp(CommandLineMixin, Application):
     """A command line application.
@@ -445,3 +1286,7 @@ class CommandLineApp(CommandLineMixin, Application):
     def setup(self):
         Application.setup(self)
         CommandLineMixin.setup(self)
+
+    def reset(self, argv):
+        Application.reset(self, argv)
+        CommandLineMixin.reset(self, argv)
@@ -0,0 +1,209 @@
+"""\
+:mod:`cli.cache` -- cached application results
+----------------------------------------------
+
+Some applications are pure functions of their parameters and input
+files: given the same command line and the same files, they always
+write the same output and exit with the same status. The
+:class:`ResultCache` remembers those results so that repeated runs can
+simply replay them.
+
+.. versionadded:: 1.1.2
+"""
+
+__license__ = """Copyright (c) 2008-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""
+
+import os
+import tempfile
+
+from cli.util import digest, fingerprint
+
+__all__ = ["ResultCache"]
+
+class Tee(object):
+    """Write to *stream*, keeping a copy of everything written."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.chunks = []
+
+    def write(self, s):
+        self.chunks.append(s)
+        self.stream.write(s)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def getvalue(self):
+        value = ''.join(self.chunks)
+        if not isinstance(value, bytes):
+            value = value.encode("utf-8")
+        return value
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+class ResultCache(object):
+    """A directory of cached application results.
+
+    Pass a :class:`ResultCache` to the :class:`cli.app.Application`
+    constructor as *cache*. Before calling :attr:`main`, the application
+    computes a key from its name, :attr:`version`, parsed
+    :attr:`params` and the fingerprints (see :func:`cli.util.fingerprint`)
+    of its input files (see :meth:`cli.app.CommandLineMixin.add_param`).
+    If the cache holds a result for that key, the saved output is written
+    to :attr:`stdout` and the saved status is returned; :attr:`main` is
+    not called. Otherwise, :attr:`main` runs as usual and its output and
+    status are saved. Runs that raise an exception are never saved.
+
+    *directory* is where results are stored. It is created if necessary;
+    by default, it is a directory under the system's temporary directory.
+
+    *max_size* is the total number of bytes the cache may occupy. When a
+    new result pushes the cache over this limit, the least recently used
+    results are removed.
+
+    *exclude* is a sequence of parameter names that do not affect the
+    result (verbosity, for example) and should be left out of the key.
+    Subclasses with more complicated needs may override :meth:`key`.
+
+    If *content* is False, input files are fingerprinted by size and
+    modification time only; otherwise their contents are hashed, too.
+    """
+    suffix = ".result"
+
+    def __init__(self, directory=None, max_size=64 * 1024 * 1024,
+            exclude=(), content=True):
+        if directory is None:
+            directory = os.path.join(tempfile.gettempdir(), "cli-cache")
+        self.directory = directory
+        self.max_size = max_size
+        self.exclude = set(exclude)
+        self.content = content
+
+    def key_params(self, app):
+        """Return a sorted list of the (name, value) parameters in the key."""
+        params = getattr(app, "params", None)
+        if params is None:
+            return []
+        return sorted((k, v) for k, v in params._get_kwargs()
+            if k not in self.exclude)
+
+    def key(self, app):
+        """Return a string identifying the result of running *app*."""
+        input_paths = getattr(app, "input_paths", lambda: [])
+        inputs = [(path, fingerprint(path, self.content))
+            for path in input_paths()]
+        return digest((app.name, app.version, self.key_params(app), inputs))
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        """Return the (status, output) tuple saved under *key*, or ``None``.
+
+        An entry that can't be read (because it was cut short, for
+        example) is removed and treated as missing.
+        """
+        path = self.path(key)
+        try:
+            f = open(path, 'rb')
+        except IOError:
+            return None
+        try:
+            data = f.read()
+        finally:
+            f.close()
+        status, newline, output = data.partition(b'\n')
+        try:
+            if not newline:
+                raise ValueError("truncated entry")
+            status = int(status)
+        except ValueError:
+            try:
+                os.remove(path)
+            except OSError: # pragma: no cover
+                pass
+            return None
+        # Mark the result as recently used.
+        try:
+            os.utime(path, None)
+        except OSError: # pragma: no cover
+            pass
+        return status, output
+
+    def put(self, key, status, output):
+        """Save *status* and *output* (a byte string) under *key*."""
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        f = os.fdopen(fd, 'wb')
+        try:
+            f.write(("%d\n" % status).encode("ascii"))
+            f.write(output)
+        finally:
+            f.close()
+        os.rename(tmp, self.path(key))
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used results until the cache fits."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError: # pragma: no cover
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        while total > self.max_size and entries:
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError: # pragma: no cover
+                pass
+            total -= size
+
+    def call(self, app, args):
+        """Call *app*'s :attr:`main` with *args*, unless the result is cached."""
+        key = self.key(app)
+        result = self.get(key)
+        if result is not None:
+            status, output = result
+            if bytes is not str:
+                output = output.decode("utf-8")
+            app.stdout.write(output)
+            return status
+
+        stdout = app.stdout
+        app.stdout = tee = Tee(stdout)
+        try:
+            returned = app.main(*args)
+        finally:
+            app.stdout = stdout
+
+        if returned is None:
+            returned = 0
+        if isinstance(returned, int):
+            self.put(key, returned, tee.getvalue())
+        return returned
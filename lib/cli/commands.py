@@ -0,0 +1,207 @@
+"""\
+:mod:`cli.commands` -- running other commands in parallel
+---------------------------------------------------------
+
+Applications often drive other programs. Running them one after the
+other leaves most of the machine idle; :func:`run_commands` runs them
+several at a time and merges their output a whole line at a time, so
+that the output of one command never splits a line written by another.
+
+.. versionadded:: 1.1.2
+"""
+
+__license__ = """Copyright (c) 2008-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""
+
+import errno
+import fcntl
+import os
+import select
+import shlex
+import subprocess
+import sys
+
+try:
+    from time import perf_counter as timer
+except ImportError:
+    from time import time as timer
+
+__all__ = ["CommandResult", "run_commands"]
+
+class CommandResult(object):
+    """The outcome of one command run by :func:`run_commands`.
+
+    :attr:`command` is the argument list, :attr:`status` its exit status
+    (negative if it was killed by a signal) and :attr:`elapsed` the
+    number of seconds it ran.
+    """
+
+    def __init__(self, index, command):
+        self.index = index
+        self.command = command
+        self.status = None
+        self.started = None
+        self.elapsed = None
+
+    def __repr__(self):
+        return "<CommandResult %r status=%r elapsed=%r>" % (
+            self.command, self.status, self.elapsed)
+
+class Running(object):
+    """A started command, its pipes and the partial lines read from them."""
+
+    def __init__(self, result, stdin, stdout, stderr, prefix):
+        self.result = result
+        result.started = timer()
+        self.process = subprocess.Popen(result.command, stdin=stdin,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, close_fds=True)
+        self.streams = {}
+        for pipe, stream in ((self.process.stdout, stdout),
+                (self.process.stderr, stderr)):
+            fd = pipe.fileno()
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+            self.streams[fd] = [pipe, stream, b'']
+        if prefix:
+            prefix = prefix % {"index": result.index,
+                "name": os.path.basename(result.command[0])}
+        self.prefix = prefix or ''
+
+    def emit(self, stream, data):
+        if not isinstance(data, str):
+            data = data.decode("utf-8", "replace")
+        stream.write(''.join(self.prefix + line
+            for line in data.splitlines(True)))
+
+    def read(self, fd):
+        """Read from *fd*, writing out complete lines; return False at EOF."""
+        pipe, stream, partial = entry = self.streams[fd]
+        try:
+            data = os.read(fd, 64 * 1024)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return True
+            raise
+        if not data:
+            if partial:
+                self.emit(stream, partial + b'\n')
+            pipe.close()
+            del self.streams[fd]
+            return False
+        data = partial + data
+        end = data.rfind(b'\n') + 1
+        if end:
+            self.emit(stream, data[:end])
+        entry[2] = data[end:]
+        return True
+
+    def finish(self):
+        result = self.result
+        result.status = self.process.wait()
+        result.elapsed = timer() - result.started
+        return result
+
+def run_commands(commands, jobs=None, stdout=None, stderr=None,
+        prefix="[%(index)d] "):
+    """Run *commands*, at most *jobs* at a time.
+
+    *commands* is a sequence of commands, each of which is a list of
+    arguments or a string to be split like a shell command line (it is
+    not interpreted by a shell). The commands' standard input is
+    :data:`os.devnull`.
+
+    *jobs* is the maximum number of commands running at once. By
+    default, it is the number of processors.
+
+    The commands' output and error streams are read through non-blocking
+    pipes as they run and copied to *stdout* and *stderr* (by default,
+    :data:`sys.stdout` and :data:`sys.stderr`) a whole line at a time.
+    *prefix* is a format string put in front of each line; it may
+    refer to the command's position in *commands* as "index" and to the
+    base name of the program as "name". If *prefix* is ``None``, lines
+    are copied unchanged.
+
+    A command that can't be started (because the program doesn't
+    exist, for example) gets status 127, like it would from a shell, and
+    the reason is written to *stderr*.
+
+    Returns a list of :class:`CommandResult` instances, in the same order
+    as *commands*. If any command is empty, :exc:`ValueError` is raised
+    before any of them is started.
+    """
+    if stdout is None:
+        stdout = sys.stdout
+    if stderr is None:
+        stderr = sys.stderr
+    if jobs is None:
+        import multiprocessing
+        jobs = multiprocessing.cpu_count()
+    jobs = max(jobs, 1)
+
+    results = []
+    for index, command in enumerate(commands):
+        if isinstance(command, basestring):
+            command = shlex.split(command)
+        command = list(command)
+        if not command:
+            raise ValueError("command %d is empty" % index)
+        results.append(CommandResult(index, command))
+
+    pending = list(reversed(results))
+    running = {}
+    fds = {}
+    devnull = open(os.devnull)
+    try:
+        while pending or running:
+            while pending and len(running) < jobs:
+                result = pending.pop()
+                try:
+                    command = Running(result, devnull, stdout, stderr, prefix)
+                except OSError as e:
+                    stderr.write("%s: %s\n" % (result.command[0], e.strerror))
+                    result.status = 127
+                    result.elapsed = timer() - result.started
+                    continue
+                running[command.process.pid] = command
+                for fd in command.streams:
+                    fds[fd] = command
+            if not running:
+                continue
+
+            try:
+                readable, _, _ = select.select(list(fds), [], [])
+            except select.error as e:
+                if e.args[0] != errno.EINTR:
+                    raise
+                continue
+            for fd in readable:
+                command = fds[fd]
+                if command.read(fd):
+                    continue
+                del fds[fd]
+                if not command.streams:
+                    del running[command.process.pid]
+                    command.finish()
+    finally:
+        for command in running.values():
+            if command.process.poll() is None:
+                command.process.kill()
+            for pipe, stream, partial in command.streams.values():
+                pipe.close()
+            command.finish()
+        devnull.close()
+
+    return results
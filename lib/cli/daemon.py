@@ -81,13 +81,24 @@ class DaemonizingMixin(object):
         when it's ready to fork into the background. It forks, flushes
         and replaces stdin, stderr and stdout with the open :attr:`null`
         file and, if requested on the command line, writes its PID to a
-        file and changes user/group.
+        file and changes user/group. Log handlers that collect the
+        records of other processes (see :class:`cli.log.AggregatingHandler`)
+        are adopted by the daemon.
+
+        .. versionchanged:: 1.1.2
+            Log handlers are adopted by the daemon.
         """
         if os.fork(): sys.exit(0)
         os.umask(0) 
         os.setsid() 
         if os.fork(): sys.exit(0)
 
+        # Take over from the process that set up the log handlers.
+        for handler in self.log.handlers:
+            adopt = getattr(handler, "adopt", None)
+            if adopt is not None:
+                adopt()
+
         self.stdout.flush()
         self.stderr.flush()
         si = open(self.null, 'r')
@@ -150,3 +161,15 @@ class DaemonizingApp(
         Application.pre_run(self)
         CommandLineMixin.pre_run(self)
         LoggingMixin.pre_run(self)
+
+    def post_run(self, returned):
+        LoggingMixin.post_run(self, returned)
+        return Application.post_run(self, returned)
+
+    def handle_error(self, error):
+        Application.handle_error(self, error)
+        LoggingMixin.handle_error(self, error)
+
+    def reset(self, argv):
+        Application.reset(self, argv)
+        CommandLineMixin.reset(self, argv)
@@ -6,20 +6,34 @@
     scripttest - 2010.03.04
         LICENSE:    MIT
         URL:        http://bitbucket.org/ianb/scripttest/src/tip/scripttest/__init__.py
+
+The modules are imported the first time they are looked up on this
+module (so ``import cli.ext`` alone costs nothing). The system-wide
+copy of each module is preferred over the bundled one.
 """
-import os
+import sys
+import types
 
 # Add included module names to __all__.
 __all__ = ["argparse", "scripttest"]
-project = os.path.basename(os.path.dirname(__file__))
-ext = project + "._ext"
 
-name, module = None, None
-for name in __all__:
-    try:
-        module = __import__(name)
-    except ImportError:
-        module = __import__('.'.join((ext, name)), {}, {}, [ext])
-    locals()[name] = module
+class LazyModule(types.ModuleType):
+    """A module whose :data:`__all__` members are imported on first use."""
+
+    def __getattr__(self, name):
+        if name not in self.__all__:
+            raise AttributeError(name)
+        try:
+            module = __import__(name)
+        except ImportError:
+            ext = self.__name__.rsplit('.', 1)[0] + "._ext"
+            module = __import__('.'.join((ext, name)), {}, {}, [ext])
+        setattr(self, name, module)
+        return module
 
-del(ext, module, name, project)
+module = LazyModule(__name__, __doc__)
+module.__all__ = __all__
+module.__file__ = __file__
+# Keep a reference to the original module so that its globals survive.
+module._original = sys.modules[__name__]
+sys.modules[__name__] = module
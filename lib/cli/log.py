@@ -22,18 +22,182 @@ OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 
 """
 
+import collections
 import logging
+import operator
+import os
+import re
+import struct
 import sys
+import threading
+import time
 
 from logging import Formatter, StreamHandler
 
 from cli.app import CommandLineApp, CommandLineMixin, Application
 
-__all__ = ["LoggingApp", "LoggingMixin", "CommandLineLogger"]
+try:
+    from time import perf_counter as timer
+except ImportError:
+    from time import time as timer
+
+__all__ = ["AggregatingHandler", "BinaryFileHandler", "BufferedFileHandler",
+    "FastFormatter", "JsonFormatter", "LoggingApp", "LoggingMixin",
+    "CommandLineLogger", "Message", "QueueHandler", "RingHandler",
+    "RotatingFileHandler", "decode_main", "lazy", "read_binary_log"]
 
 # Silence multiprocessing errors.
 logging.logMultiprocessing = 0
 
+class FastFormatter(Formatter):
+    """A :class:`logging.Formatter` that does less work per record.
+
+    It accepts the same *fmt* and *datefmt* arguments (only the "%"
+    style) and produces the same output, but:
+
+    * *fmt* is compiled once into a plain positional format string and a
+      function that fetches the record attributes it needs, instead of
+      being interpolated with a dictionary of all of the record's
+      attributes;
+    * the timestamp is formatted at most once per second, since
+      :data:`date_format` rarely goes below seconds (the milliseconds
+      of the default format are still added to each record).
+
+    .. versionadded:: 1.1.2
+    """
+    field = re.compile(r"%\((\w+)\)([#0 +-]*\d*(?:\.\d+)?[diouxXeEfFgGcrs])")
+    default_date_format = "%Y-%m-%d %H:%M:%S"
+
+    def __init__(self, fmt=None, datefmt=None):
+        Formatter.__init__(self, fmt, datefmt)
+        if fmt is None:
+            fmt = "%(message)s"
+        self.compile(fmt)
+        self.cache = (None, None)
+
+    def compile(self, fmt):
+        """Turn *fmt* into :attr:`template` and :attr:`fields`."""
+        names = []
+        def positional(match):
+            names.append(match.group(1))
+            return "%" + match.group(2)
+        self.template = self.field.sub(positional, fmt)
+        self.names = names
+        self.uses_time = "asctime" in names
+        if not names:
+            self.fields = lambda record: ()
+        elif len(names) == 1:
+            getter = operator.attrgetter(names[0])
+            self.fields = lambda record: (getter(record),)
+        else:
+            self.fields = operator.attrgetter(*names)
+
+    def usesTime(self):
+        return self.uses_time
+
+    def formatTime(self, record, datefmt=None):
+        """Format *record*'s creation time, reusing the last second's result."""
+        second = int(record.created)
+        cached_second, cached = self.cache
+        if second != cached_second:
+            cached = time.strftime(datefmt or self.default_date_format,
+                self.converter(second))
+            self.cache = (second, cached)
+        if datefmt is None:
+            return "%s,%03d" % (cached, record.msecs)
+        return cached
+
+    def format(self, record):
+        record.message = record.getMessage()
+        if self.uses_time:
+            record.asctime = self.formatTime(record, self.datefmt)
+        try:
+            s = self.template % self.fields(record)
+        except AttributeError as e:
+            raise KeyError(str(e))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            if s[-1:] != "\n":
+                s = s + "\n"
+            s = s + record.exc_text
+        stack_info = getattr(record, "stack_info", None)
+        if stack_info:
+            if s[-1:] != "\n":
+                s = s + "\n"
+            s = s + self.formatStack(stack_info)
+        return s
+
+class JsonFormatter(FastFormatter):
+    """Format each record as a JSON object on a single line.
+
+    The object has "time", "level", "name" and "message" members, an
+    "exc_info" member holding the formatted traceback if there is one,
+    and a member for each attribute added to the record through the
+    *extra* argument of the logging calls; those named like one of the
+    other members ("time" or "level") get an "extra_" prefix so that they
+    don't hide them. "time" is the record's creation time formatted with
+    *datefmt* (by default, ISO 8601 to the second; if *datefmt* is
+    ``None``, that of :class:`logging.Formatter`) followed by
+    milliseconds.
+
+    The output is built directly as a string, without an intermediate
+    dictionary: the member names are encoded once, strings go through
+    :mod:`json`'s C string encoder and the timestamp is cached as in
+    :class:`FastFormatter`. Other values in *extra* are encoded with
+    :func:`json.dumps` (falling back to their :func:`repr`).
+
+    .. versionadded:: 1.1.2
+    """
+    head = '{"time": %s, "level": %s, "name": %s, "message": %s'
+    reserved = frozenset(logging.makeLogRecord({}).__dict__) | \
+        frozenset(["message", "asctime"])
+    """Record attributes that aren't copied as *extra* members."""
+    members = frozenset(["time", "level", "name", "message", "exc_info",
+        "stack_info"])
+    """The members written for every record."""
+
+    def __init__(self, fmt=None, datefmt="%Y-%m-%dT%H:%M:%S"):
+        import json
+        from json.encoder import encode_basestring_ascii
+        FastFormatter.__init__(self, fmt, datefmt)
+        self.encode = encode_basestring_ascii
+        self.dumps = json.JSONEncoder(default=repr).encode
+        self.keys = {}
+
+    def format(self, record):
+        encode = self.encode
+        s = self.head % (
+            encode("%s.%03d" % (self.formatTime(record,
+                self.datefmt or self.default_date_format), record.msecs)),
+            encode(record.levelname), encode(record.name),
+            encode(record.getMessage()))
+
+        keys = self.keys
+        reserved = self.reserved
+        for name, value in record.__dict__.items():
+            if name in reserved:
+                continue
+            key = keys.get(name)
+            if key is None:
+                member = name
+                if member in self.members:
+                    member = "extra_" + name
+                key = keys[name] = ", %s: " % encode(member)
+            if isinstance(value, basestring):
+                s += key + encode(value)
+            else:
+                s += key + self.dumps(value)
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            s += ', "exc_info": ' + encode(record.exc_text)
+        stack_info = getattr(record, "stack_info", None)
+        if stack_info:
+            s += ', "stack_info": ' + encode(self.formatStack(stack_info))
+        return s + "}"
+
 class FileHandler(logging.FileHandler):
 
     def close(self):
@@ -45,6 +209,400 @@ class FileHandler(logging.FileHandler):
         """
         pass    # pragma: no cover
 
+class BufferedFileHandler(FileHandler):
+    """A :class:`FileHandler` that writes many records at once.
+
+    :class:`logging.FileHandler` writes and flushes each record as it is
+    logged. A :class:`BufferedFileHandler` collects formatted records and
+    writes them to the file in one call when any of these happen:
+
+    * the buffer holds *bufsize* characters or more;
+    * a record at *flush_level* (default: :data:`logging.WARNING`) or
+      above is logged, so that problems are on disk right away;
+    * *interval* seconds have passed since the last write (checked by a
+      background thread, so records don't linger when the application
+      goes quiet);
+    * :meth:`flush` is called, as :func:`logging.shutdown` does when the
+      application exits.
+
+    The other arguments are passed to :class:`logging.FileHandler`.
+
+    .. versionadded:: 1.1.2
+    """
+
+    def __init__(self, filename, mode='a', encoding=None, bufsize=64 * 1024,
+            interval=1.0, flush_level=logging.WARNING):
+        FileHandler.__init__(self, filename, mode, encoding)
+        self.bufsize = bufsize
+        self.interval = interval
+        self.flush_level = flush_level
+        self.terminator = getattr(self, "terminator", "\n")
+        self.buffer = []
+        self.size = 0
+        self.flusher = None
+
+    def emit(self, record):
+        """Add *record* to the buffer, writing the buffer if necessary."""
+        try:
+            message = self.format(record) + self.terminator
+        except Exception:
+            self.handleError(record)
+            return
+        self.buffer.append(message)
+        self.size += len(message)
+        if self.size >= self.bufsize or record.levelno >= self.flush_level:
+            self.flush()
+        elif self.flusher is None or self.flusher[0] != os.getpid():
+            self.start_flusher()
+
+    def start_flusher(self):
+        # Keep track of the process that started the thread; forked
+        # children (see cli.daemon) need their own.
+        stopped = threading.Event()
+        thread = threading.Thread(target=self.flush_periodically,
+            args=(stopped,))
+        thread.daemon = True
+        self.flusher = (os.getpid(), thread, stopped)
+        thread.start()
+
+    def flush_periodically(self, stopped):
+        while True:
+            # Event.wait() only returns the flag on Python 2.7 and later.
+            stopped.wait(self.interval)
+            if stopped.is_set():
+                return
+            self.acquire()
+            try:
+                if self.buffer:
+                    self.flush()
+            finally:
+                self.release()
+
+    def flush(self):
+        """Write the buffer to the file."""
+        self.acquire()
+        try:
+            buffer, self.buffer, self.size = self.buffer, [], 0
+            if buffer and self.stream is not None:
+                self.write(buffer)
+            FileHandler.flush(self)
+        finally:
+            self.release()
+
+    def write(self, buffer):
+        data = ''.join(buffer)
+        try:
+            self.stream.write(data)
+        except UnicodeError:
+            self.stream.write(data.encode("utf-8"))
+
+    def close(self):
+        """Write the buffer and stop the background thread.
+
+        As with :class:`FileHandler`, the file is left open.
+        """
+        self.flush()
+        if self.flusher is not None:
+            self.flusher[2].set()
+            self.flusher = None
+        logging.Handler.close(self)
+
+class RotatingFileHandler(BufferedFileHandler):
+    """A :class:`BufferedFileHandler` that starts a new file now and then.
+
+    When the file grows beyond *max_bytes*, or when the period named by
+    *rotate* ("hourly", "daily" or "weekly", in local time) is over, the
+    file is renamed to *filename* followed by the time of the rotation
+    (for example, "app.log.20100102-030405") and a new file is opened.
+    Renaming is quick, so it happens when a record that fills the file or
+    ends the period is logged (:meth:`flush` only writes the buffer); the
+    rest of the work happens in a background thread, so that logging
+    doesn't wait for it. There, if *compress* is True, the old file is
+    compressed with :mod:`gzip` (adding ".gz" to its name) and, if
+    *backups* is not ``None``, all but the newest *backups* old files are
+    removed. The threads take turns, so that one never removes a file
+    that another is still compressing, and errors (an old file removed
+    by someone else, say) are reported on :data:`sys.stderr`.
+
+    *bufsize* defaults to 0, which writes each record right away; the
+    other arguments are passed to :class:`BufferedFileHandler`.
+    :meth:`close` waits for the background work to finish.
+
+    .. versionadded:: 1.1.2
+    """
+    periods = {"hourly": 3600, "daily": 86400, "weekly": 7 * 86400}
+
+    def __init__(self, filename, max_bytes=None, rotate=None, backups=None,
+            compress=True, mode='a', encoding=None, bufsize=0, **kwargs):
+        if rotate is not None and rotate not in self.periods:
+            raise ValueError("unknown rotation period: %r" % rotate)
+        BufferedFileHandler.__init__(self, filename, mode, encoding,
+            bufsize=bufsize, **kwargs)
+        self.max_bytes = max_bytes
+        self.rotate = rotate
+        self.backups = backups
+        self.compress = compress
+        self.workers = []
+        self.cleanup_lock = threading.Lock()
+        try:
+            self.written = os.path.getsize(self.baseFilename)
+        except OSError: # pragma: no cover
+            self.written = 0
+        self.rollover_at = self.next_rollover(time.time())
+        self.last_stamp = (None, 0)
+
+    def next_rollover(self, now):
+        """Return the time when the period containing *now* ends."""
+        if self.rotate is None:
+            return None
+        period = self.periods[self.rotate]
+        # Align periods with local midnight (and weeks with Monday).
+        tm = time.localtime(now)
+        offset = getattr(tm, "tm_gmtoff", None)
+        if offset is None:
+            offset = tm.tm_isdst and -time.altzone or -time.timezone
+        local = now + offset
+        if self.rotate == "weekly":
+            # The epoch was a Thursday.
+            local += 3 * 86400
+        return now - (local % period) + period
+
+    def emit(self, record):
+        """Add *record* to the file and start a new file if it is time."""
+        BufferedFileHandler.emit(self, record)
+        if (self.max_bytes and self.written + self.size >= self.max_bytes) or \
+                (self.rollover_at is not None and
+                    time.time() >= self.rollover_at):
+            self.acquire()
+            try:
+                self.flush()
+                self.rollover()
+            finally:
+                self.release()
+
+    def write(self, buffer):
+        BufferedFileHandler.write(self, buffer)
+        self.written += sum(len(message) for message in buffer)
+
+    def rollover(self):
+        """Rename the file, open a new one and queue the old one for cleanup."""
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+        # Number rotations within the same second so that names still
+        # sort in order (even if earlier ones have been removed).
+        n = 0
+        if stamp == self.last_stamp[0]:
+            n = self.last_stamp[1] + 1
+        while True:
+            target = "%s.%s" % (self.baseFilename, stamp)
+            if n:
+                target += ".%d" % n
+            if not (os.path.exists(target) or os.path.exists(target + ".gz")):
+                break
+            n += 1
+        self.last_stamp = (stamp, n)
+
+        if self.stream is not None:
+            self.stream.close()
+        os.rename(self.baseFilename, target)
+        self.stream = self._open()
+        self.written = 0
+        self.rollover_at = self.next_rollover(now)
+
+        self.workers = [w for w in self.workers if w.is_alive()]
+        worker = threading.Thread(target=self.cleanup, args=(target,))
+        worker.daemon = True
+        self.workers.append(worker)
+        worker.start()
+
+    def cleanup(self, path):
+        """Compress *path* and remove old files, as configured."""
+        self.cleanup_lock.acquire()
+        try:
+            if self.compress and os.path.exists(path):
+                self.gzip(path)
+            if self.backups is not None:
+                self.prune()
+        except (IOError, OSError) as e:
+            sys.stderr.write("cannot clean up %s: %s\n" % (path, e))
+        finally:
+            self.cleanup_lock.release()
+
+    def gzip(self, path):
+        import gzip
+        import shutil
+        tmp = path + ".gz.tmp"
+        try:
+            src = open(path, 'rb')
+            try:
+                dst = gzip.open(tmp, 'wb')
+                try:
+                    shutil.copyfileobj(src, dst, 256 * 1024)
+                finally:
+                    dst.close()
+            finally:
+                src.close()
+            os.rename(tmp, path + ".gz")
+        except:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        os.remove(path)
+
+    def rotated(self):
+        """Return the names of the old files, oldest first."""
+        directory, base = os.path.split(self.baseFilename)
+        prefix = base + "."
+        names = [name for name in os.listdir(directory or os.curdir)
+            if name.startswith(prefix) and not name.endswith(".tmp")
+            and name[len(prefix):len(prefix) + 1].isdigit()]
+        def key(name):
+            # Order by time stamp, then by the counter added for rotations
+            # in the same second.
+            parts = name[len(prefix):].replace(".gz", "").split(".")
+            return parts[0], len(parts) > 1 and int(parts[1]) or 0
+        return [os.path.join(directory, name) for name in sorted(names, key=key)]
+
+    def prune(self):
+        old = self.rotated()
+        for path in old[:max(len(old) - self.backups, 0)]:
+            try:
+                os.remove(path)
+            except OSError: # pragma: no cover
+                pass
+
+    def close(self):
+        """Flush the file and wait for the background work to finish."""
+        BufferedFileHandler.close(self)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+
+class BinaryFileHandler(BufferedFileHandler):
+    """A :class:`BufferedFileHandler` that writes a compact binary format.
+
+    Instead of formatting each record, the handler writes the record's
+    time and the arguments of the logging call, packed with
+    :mod:`struct`, along with a number identifying the record's
+    template: its logger, level, format string and the types of its
+    arguments. Each template is written only once per file, the first
+    time it is used, together with a precompiled :class:`struct.Struct`
+    kept by the handler; a record whose arguments are all numbers is
+    then packed by a single call. Integers, floats, booleans, ``None``
+    and strings are packed as they are; other arguments (and the
+    arguments of a message whose format string isn't a string) are
+    converted to strings first. A record's traceback, if any, is written
+    as a string.
+
+    :func:`read_binary_log` turns the file back into
+    :class:`logging.LogRecord` instances, and the
+    :command:`cli-decode-log` command (see :func:`decode_main`) formats
+    them as text. The records have their original time, level, logger
+    name, message and traceback, but no other attributes.
+
+    Processes should not share a :class:`BinaryFileHandler`, since each
+    would number its templates separately; to log from forked processes,
+    wrap it in an :class:`AggregatingHandler`.
+
+    *bufsize* defaults to 1MB; the other arguments are passed to
+    :class:`BufferedFileHandler`.
+
+    .. versionadded:: 1.1.2
+    """
+    magic = b"CLILOG\x01\n"
+    template_header = struct.Struct("<cIB")
+    record_header = "<cId"
+    length = struct.Struct("<I")
+    codes = {int: b'q', long: b'q', float: b'd', bool: b'?',
+        type(None): b'n', bytes: b'b', unicode: b's'}
+    """Map argument types to the codes used in templates."""
+    fields = {b'q': "q", b'd': "d", b'?': "?", b'n': "", b'b': "I", b's': "I"}
+    """Map codes to :mod:`struct` fields ("I" is the length of a string)."""
+
+    def __init__(self, filename, mode='ab', bufsize=1024 * 1024, **kwargs):
+        try:
+            empty = 'w' in mode or not os.path.getsize(filename)
+        except OSError:
+            empty = True
+        BufferedFileHandler.__init__(self, filename, mode, bufsize=bufsize,
+            **kwargs)
+        self.terminator = b''
+        self.templates = {}
+        if empty:
+            # Write the header right away, so that it comes first even if
+            # records reach the stream some other way.
+            self.stream.write(self.magic)
+            self.stream.flush()
+
+    def pack_string(self, value):
+        if not isinstance(value, bytes):
+            value = value.encode("utf-8")
+        return self.length.pack(len(value)) + value
+
+    def define(self, key):
+        """Return the bytes defining a new template for *key*."""
+        name, levelno, msg, types = key
+        codes = b''.join([self.codes.get(t, b's') for t in types])
+        layout = struct.Struct(self.record_header +
+            ''.join([self.fields[codes[i:i + 1]] for i in range(len(codes))]))
+        # If every argument is packed as it is, there's nothing to do
+        # but call layout.pack(); otherwise, list what to do with each.
+        kinds = None
+        if codes.strip(b'qd?'):
+            kinds = tuple([codes[i:i + 1] for i in range(len(codes))])
+        template = (len(self.templates), layout, kinds)
+        self.templates[key] = template
+        return b''.join([
+            self.template_header.pack(b'T', template[0], levelno),
+            self.pack_string(name), self.pack_string(msg),
+            self.pack_string(codes)])
+
+    def format(self, record):
+        """Return the bytes for *record* (and its template, if it is new)."""
+        msg, args = record.msg, record.args
+        if not isinstance(msg, basestring) or not isinstance(args, tuple):
+            msg, args = "%s", (record.getMessage(),)
+        key = (record.name, record.levelno, msg, tuple(map(type, args)))
+        template = self.templates.get(key)
+        prefix = b''
+        if template is None:
+            prefix = self.define(key)
+            template = self.templates[key]
+        number, layout, kinds = template
+
+        if record.exc_info and not record.exc_text:
+            formatter = self.formatter or logging._defaultFormatter
+            record.exc_text = formatter.formatException(record.exc_info)
+        tag = record.exc_text and b'X' or b'R'
+        values, strings = args, ()
+        if kinds is not None:
+            values, strings = [], []
+            for arg, kind in zip(args, kinds):
+                if kind == b'n':
+                    continue
+                elif kind == b'b' or kind == b's':
+                    if not isinstance(arg, (bytes, unicode)):
+                        arg = str(arg)
+                    if not isinstance(arg, bytes):
+                        arg = arg.encode("utf-8")
+                    strings.append(arg)
+                    arg = len(arg)
+                values.append(arg)
+        try:
+            data = layout.pack(tag, number, record.created, *values)
+        except struct.error:
+            # An integer too large for 64 bits.
+            return prefix + self.format(logging.makeLogRecord(
+                dict(record.__dict__, msg="%s", args=(record.getMessage(),))))
+        if strings:
+            data += b''.join(strings)
+        if record.exc_text:
+            data += self.pack_string(record.exc_text)
+        return prefix + data
+
+    def write(self, buffer):
+        self.stream.write(b''.join(buffer))
+
 class NullHandler(logging.Handler):
     """A blackhole handler.
 
@@ -55,12 +613,562 @@ class NullHandler(logging.Handler):
         """Ignore the record."""
         pass
 
+class QueueHandler(logging.Handler):
+    """Hand records to another handler in a background thread.
+
+    :meth:`emit` only appends the record to a queue; a worker thread
+    takes records off the queue in batches of up to *batch* and passes
+    them to *handler*, so the thread that logs never waits for
+    formatting or for the file to be written. Records are formatted
+    after they are logged, so arguments to the logging calls shouldn't
+    be modified afterwards.
+
+    *capacity* is the maximum number of records in the queue. *overflow*
+    decides what happens to a record logged when the queue is full:
+
+    "block"
+        wait for the worker to make room (default);
+    "drop-oldest"
+        discard the oldest record in the queue;
+    "drop"
+        discard the new record.
+
+    Dropped records are counted in :attr:`dropped`, and the count is
+    logged through *handler* as a warning when the queue is drained.
+
+    :meth:`flush` waits until every queued record has been handled. It is
+    called by :meth:`cli.log.LoggingMixin.post_run` and, when the
+    interpreter exits (or the application exits early; see *fast_exit* in
+    :class:`cli.app.Application`), by :func:`logging.shutdown`.
+
+    .. versionadded:: 1.1.2
+    """
+    policies = ("block", "drop-oldest", "drop")
+    stream_types = (StreamHandler, logging.FileHandler, FileHandler)
+    """Handler classes whose batches are written straight to their stream.
+
+    Other handlers (including subclasses of these, like
+    :class:`BufferedFileHandler`) get each record through
+    :meth:`logging.Handler.handle`.
+    """
+
+    def __init__(self, handler, capacity=10000, overflow="block", batch=256):
+        if overflow not in self.policies:
+            raise ValueError("unknown overflow policy: %r" % overflow)
+        logging.Handler.__init__(self)
+        self.handler = handler
+        self.capacity = capacity
+        self.overflow = overflow
+        self.batch = batch
+        self.dropped = 0
+        self.reported = 0
+        self.start()
+
+    def start(self):
+        """Start the worker thread with an empty queue."""
+        self.pid = os.getpid()
+        self.queue = collections.deque()
+        self.busy = 0
+        self.closing = False
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self.work)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def handle(self, record):
+        # The queue has its own lock, so skip the handler lock.
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record):
+        """Queue *record*."""
+        if self.closing:
+            self.handler.handle(record)
+            return
+        if self.pid != os.getpid():
+            # We've been forked (say, by cli.daemon); the worker didn't
+            # come along, and the parent owns the records already queued.
+            self.start()
+        cond = self.cond
+        cond.acquire()
+        try:
+            self.put(record)
+        finally:
+            cond.release()
+
+    def put(self, record):
+        # Called with the condition held.
+        queue = self.queue
+        if len(queue) >= self.capacity:
+            if self.overflow == "drop":
+                self.dropped += 1
+                return
+            elif self.overflow == "drop-oldest":
+                queue.popleft()
+                self.dropped += 1
+            else:
+                while len(queue) >= self.capacity and self.thread.is_alive():
+                    self.cond.wait()
+        queue.append(record)
+        if len(queue) == 1:
+            self.cond.notify_all()
+
+    def work(self):
+        cond = self.cond
+        queue = self.queue
+        while True:
+            cond.acquire()
+            try:
+                while not queue and not self.closing:
+                    cond.wait()
+                if not queue:
+                    return
+                batch = [queue.popleft()
+                    for i in range(min(len(queue), self.batch))]
+                self.busy = len(batch)
+                cond.notify_all()
+            finally:
+                cond.release()
+
+            self.write(batch)
+            if self.dropped != self.reported and not queue:
+                self.report_dropped()
+
+            cond.acquire()
+            try:
+                self.busy = 0
+                cond.notify_all()
+            finally:
+                cond.release()
+
+    def write(self, records):
+        """Pass *records* to :attr:`handler`.
+
+        If :attr:`handler` is one of :attr:`stream_types` (not a
+        subclass, which may do more than write to its stream), the batch
+        is formatted and written to its stream in one call.
+        """
+        handler = self.handler
+        if type(handler) in self.stream_types and \
+                getattr(handler, "stream", None) is not None:
+            self.write_stream(handler, records)
+        else:
+            for record in records:
+                handler.handle(record)
+        handler.flush()
+
+    def report_dropped(self):
+        dropped = self.dropped - self.reported
+        self.reported += dropped
+        self.handler.handle(logging.makeLogRecord({
+            "levelno": logging.WARNING, "levelname": "WARNING",
+            "msg": "%d log messages dropped", "args": (dropped,)}))
+        self.handler.flush()
+
+    def write_stream(self, handler, records):
+        terminator = getattr(handler, "terminator", "\n")
+        lines = []
+        passed = []
+        for record in records:
+            if record.levelno < handler.level or not handler.filter(record):
+                continue
+            try:
+                lines.append(handler.format(record) + terminator)
+                passed.append(record)
+            except Exception:
+                handler.handleError(record)
+        handler.acquire()
+        try:
+            try:
+                handler.stream.write(''.join(lines))
+            except UnicodeError:
+                # Let the handler deal with the encoding, one at a time.
+                for record in passed:
+                    handler.emit(record)
+        finally:
+            handler.release()
+
+    def flush(self):
+        """Wait until all queued records have been handled."""
+        if self.pid != os.getpid():
+            return
+        cond = self.cond
+        cond.acquire()
+        try:
+            while not self.idle() and self.thread.is_alive():
+                cond.wait(0.1)
+        finally:
+            cond.release()
+
+    def idle(self):
+        # Called with the condition held.
+        return not (self.queue or self.busy)
+
+    def close(self):
+        """Handle the remaining records and stop the worker thread."""
+        if self.pid == os.getpid():
+            self.cond.acquire()
+            try:
+                self.closing = True
+                self.cond.notify_all()
+            finally:
+                self.cond.release()
+            self.thread.join()
+        logging.Handler.close(self)
+
+class AggregatingHandler(QueueHandler):
+    """Write the records of forked processes from the process that made it.
+
+    When an application forks workers (see :mod:`cli.parallel`), each
+    child inherits the application's handlers and, with them, the log
+    file. Children writing to the same file at once contend for it and
+    may interleave partial lines. An :class:`AggregatingHandler` keeps
+    all writing in the process that created it: there, it works like a
+    :class:`QueueHandler`, while in forked children :meth:`emit` sends
+    the record (with its message already formatted) over a UNIX datagram
+    socket. A thread in the creating process receives the records and
+    queues them in the order they arrived, so that *handler* writes
+    them in batches along with the creating process' own records.
+
+    Each record is sent in a single datagram, so records are never split
+    or mixed up. A child sending faster than the records can be written
+    waits once the socket's buffer is full, but for no more than
+    :attr:`send_timeout` seconds; children close their copy of the
+    receiving end, so that once the creating process has exited, sending
+    fails right away. Either way, the record is passed to
+    :meth:`logging.Handler.handleError`. :meth:`flush` waits for the
+    records the children have already sent, so the creating process
+    should wait for its children (as :class:`cli.parallel.ParallelFilesMixin`
+    does) before calling it.
+
+    A process that outlives the one that created the handler (like a
+    daemon; see :meth:`cli.daemon.DaemonizingMixin.daemonize`) should
+    call :meth:`adopt` to take over the writing.
+
+    Arguments are passed to :class:`QueueHandler`.
+
+    .. versionadded:: 1.1.2
+    """
+    send_timeout = 10.0
+
+    def start(self):
+        import socket
+        self.reader, self.sender = socket.socketpair(
+            socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.detached = None
+        self.reader.setblocking(False)
+        # No datagram can be larger than the send buffer.
+        self.datagram_size = self.sender.getsockopt(
+            socket.SOL_SOCKET, socket.SO_SNDBUF)
+        self.listening = True
+        QueueHandler.start(self)
+        self.listener = threading.Thread(target=self.listen)
+        self.listener.daemon = True
+        self.listener.start()
+
+    def adopt(self):
+        """Make this process the one that writes the records.
+
+        Records queued but not yet written by the old process are lost.
+        """
+        self.reader.close()
+        self.sender.close()
+        self.start()
+
+    def emit(self, record):
+        """Queue *record*, or send it to the creating process."""
+        pid = os.getpid()
+        if self.pid == pid or self.closing:
+            return QueueHandler.emit(self, record)
+        try:
+            if self.detached != pid:
+                # Without this process' copy of the reader, sending fails
+                # instead of blocking once the creating process is gone.
+                self.reader.close()
+                self.detached = pid
+            self.send(self.dump(record))
+        except Exception:
+            self.handleError(record)
+
+    def send(self, data):
+        """Send *data*, waiting at most :attr:`send_timeout` seconds."""
+        import errno
+        import select
+        import socket
+        deadline = timer() + self.send_timeout
+        while True:
+            try:
+                return self.sender.send(data, socket.MSG_DONTWAIT)
+            except socket.error as e:
+                if e.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    raise
+            remaining = deadline - timer()
+            if remaining <= 0:
+                raise socket.timeout("timed out sending a log record")
+            try:
+                select.select([], [self.sender], [], remaining)
+            except select.error as e:
+                if e.args[0] != errno.EINTR:
+                    raise
+
+    def dump(self, record):
+        """Return *record* as a string that can be sent to another process."""
+        try:
+            import cPickle as pickle
+        except ImportError:
+            import pickle
+        if record.exc_info and not record.exc_text:
+            formatter = self.handler.formatter or logging._defaultFormatter
+            record.exc_text = formatter.formatException(record.exc_info)
+        state = dict(record.__dict__)
+        state["msg"] = record.getMessage()
+        state["args"] = None
+        state["exc_info"] = None
+        return pickle.dumps(state, -1)
+
+    def load(self, data):
+        try:
+            import cPickle as pickle
+        except ImportError:
+            import pickle
+        return logging.makeLogRecord(pickle.loads(data))
+
+    def listen(self):
+        import errno
+        import select
+        import socket
+        reader = self.reader
+        cond = self.cond
+        while True:
+            try:
+                select.select([reader], [], [])
+            except select.error as e:
+                if e.args[0] != errno.EINTR:
+                    raise
+                continue
+            cond.acquire()
+            try:
+                while True:
+                    try:
+                        data = reader.recv(self.datagram_size)
+                    except socket.error as e:
+                        if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                            break
+                        raise
+                    if not data:
+                        # Woken up by close().
+                        continue
+                    try:
+                        record = self.load(data)
+                    except Exception:
+                        self.dropped += 1
+                        continue
+                    self.put(record)
+                if not self.listening:
+                    return
+            finally:
+                cond.release()
+
+    def idle(self):
+        import select
+        readable, _, _ = select.select([self.reader], [], [], 0)
+        return not readable and QueueHandler.idle(self)
+
+    def close(self):
+        """Handle the remaining records and stop the threads."""
+        if self.pid == os.getpid() and self.listening:
+            self.listening = False
+            self.sender.send(b'')
+            self.listener.join()
+            QueueHandler.close(self)
+            self.reader.close()
+            self.sender.close()
+        else:
+            QueueHandler.close(self)
+
+class RingHandler(logging.Handler):
+    """Keep recent low-level records in memory until they are needed.
+
+    Logging everything is often too slow for an application that runs
+    for a long time, but when something goes wrong the messages that led
+    up to it are the most useful ones. A :class:`RingHandler` passes
+    records at *threshold* or above to *handler* and keeps the most
+    recent *capacity* records below it in a ring buffer allocated up
+    front. Keeping a record costs a list assignment: it is neither
+    formatted nor written. The buffer is written to *handler*, oldest
+    record first, by :meth:`dump`, which happens when:
+
+    * a record at *flush_level* (default: :data:`logging.ERROR`) or
+      above is logged (the buffer is written before that record);
+    * :attr:`main` raises an exception (see
+      :meth:`cli.log.LoggingMixin.handle_error` and
+      :meth:`cli.log.LoggingMixin.post_run`);
+    * the process receives one of *signals* (by default,
+      :data:`signal.SIGUSR2`) after :meth:`start` has been called.
+
+    For records below *threshold* to reach the handler at all, the
+    logger's level must be lower (for example, :data:`logging.DEBUG`).
+    As with :class:`QueueHandler`, records are formatted after they are
+    logged, so arguments to the logging calls shouldn't be modified
+    afterwards.
+
+    .. versionadded:: 1.1.2
+    """
+
+    def __init__(self, handler, capacity=1000, threshold=logging.WARNING,
+            flush_level=logging.ERROR, signals=None):
+        logging.Handler.__init__(self)
+        self.handler = handler
+        self.capacity = capacity
+        self.threshold = threshold
+        self.flush_level = flush_level
+        if signals is None:
+            import signal
+            signals = [signal.SIGUSR2]
+        self.signals = signals
+        self.handlers = {}
+        self.empty = (None,) * capacity
+        self.ring = list(self.empty)
+        self.next = 0
+
+    def emit(self, record):
+        """Keep *record* or pass it on to :attr:`handler`."""
+        levelno = record.levelno
+        if levelno < self.threshold:
+            i = self.next
+            self.ring[i] = record
+            i += 1
+            if i == self.capacity:
+                i = 0
+            self.next = i
+            return
+        if levelno >= self.flush_level:
+            self.dump()
+        self.handler.handle(record)
+
+    def dump(self, signum=None, frame=None):
+        """Write the records in the buffer to :attr:`handler` and empty it."""
+        self.acquire()
+        try:
+            ring, i = self.ring, self.next
+            records = ring[i:] + ring[:i]
+            ring[:] = self.empty
+            self.next = 0
+            for record in records:
+                if record is not None:
+                    self.handler.handle(record)
+        finally:
+            self.release()
+        self.handler.flush()
+
+    def start(self):
+        """Install the signal handlers that call :meth:`dump`."""
+        import signal
+        for signum in self.signals:
+            try:
+                self.handlers[signum] = signal.signal(signum, self.dump)
+            except ValueError: # pragma: no cover
+                # Not in the main thread.
+                pass
+
+    def adopt(self):
+        """Pass :meth:`AggregatingHandler.adopt` on to :attr:`handler`."""
+        adopt = getattr(self.handler, "adopt", None)
+        if adopt is not None:
+            adopt()
+
+    def flush(self):
+        self.handler.flush()
+
+    def close(self):
+        """Restore the signal handlers and close :attr:`handler`."""
+        import signal
+        for signum, handler in self.handlers.items():
+            signal.signal(signum, handler)
+        self.handlers = {}
+        self.handler.close()
+        logging.Handler.close(self)
+
+class lazy(object):
+    """Call *func* with *args* only if the message is actually logged.
+
+    Pass a :class:`lazy` instance as an argument to a logging call, in
+    place of a value that is expensive to compute::
+
+        app.log.debug("state: %s", lazy(dump_state, app))
+
+    The function is called when the message is formatted; if the
+    message is below the logger's level, it is never called.
+
+    .. versionadded:: 1.1.2
+    """
+    __slots__ = ("func", "args", "kwargs")
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return str(self.func(*self.args, **self.kwargs))
+
+    def __repr__(self):
+        return repr(self.func(*self.args, **self.kwargs))
+
+class Message(object):
+    """A message formatted with :meth:`str.format` when it is logged.
+
+    Pass a :class:`Message` instance as the message of a logging call
+    (without further arguments)::
+
+        app.log.debug(Message("{0} items in {elapsed:.1f}s", n, elapsed=t))
+
+    Nothing is formatted if the message is below the logger's level.
+
+    .. versionadded:: 1.1.2
+    """
+    __slots__ = ("fmt", "args", "kwargs")
+
+    def __init__(self, fmt, *args, **kwargs):
+        self.fmt = fmt
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return self.fmt.format(*self.args, **self.kwargs)
+
 class CommandLineLogger(logging.Logger):
     """Provide extra configuration smarts for loggers.
 
     In addition to the powers of a regular logger, a
     :class:`CommandLineLogger` can set its verbosity levels based on a
     populated :class:`argparse.Namespace`.
+
+    Logging below the logger's level is nearly free: whenever
+    :attr:`level` changes, the methods for the disabled levels
+    (:meth:`debug`, :meth:`info` and so on) are replaced by a function
+    that does nothing, and :meth:`isEnabledFor` answers from a table of
+    the standard levels. Arguments are still evaluated by the caller, so
+    pass them separately (``log.debug("%d", x)``, not
+    ``log.debug("%d" % x)``) and wrap expensive ones in :class:`lazy` or
+    :class:`Message`.
+
+    A message logged over and over (a warning in a loop, say) can be
+    limited with :meth:`limit`.
+
+    .. versionchanged:: 1.1.2
+        Added the fast path for disabled levels and :meth:`limit`.
+    """
+    methods = (("debug", logging.DEBUG), ("info", logging.INFO),
+        ("warning", logging.WARNING), ("warn", logging.WARNING),
+        ("error", logging.ERROR), ("exception", logging.ERROR),
+        ("critical", logging.CRITICAL), ("fatal", logging.CRITICAL))
+    enabled = {}
+    """A dictionary mapping each standard level to True if messages at
+    that level are logged. It is empty if the logger has no level of
+    its own (:data:`logging.NOTSET`).
     """
     default_level = logging.WARN
     """An integer representing the default logging level.
@@ -74,6 +1182,145 @@ class CommandLineLogger(logging.Logger):
     Default: :data:`logging.CRITICAL` (only critical messages will
     be shown).
     """
+    rate = None
+    sample = 1
+    sites = None
+    max_sites = 10000
+    """The most messages :meth:`limit` keeps counts for at once."""
+
+    def get_level(self):
+        return self.__dict__.get("_level", logging.NOTSET)
+
+    def set_level(self, level):
+        self._level = level
+        self.enabled = {}
+        for name, value in self.methods:
+            if level and value < level:
+                setattr(self, name, self.ignore)
+            else:
+                self.__dict__.pop(name, None)
+            if level:
+                self.enabled[value] = value >= level
+        # Python 3.7+ caches isEnabledFor() results.
+        cache = self.__dict__.get("_cache")
+        if cache:
+            cache.clear()
+
+    level = property(get_level, set_level, doc="""\
+        The logger's level.
+
+        Setting it updates :attr:`enabled` and the logging methods.
+        """)
+    del(get_level, set_level)
+
+    def ignore(self, msg, *args, **kwargs):
+        """Stand in for the logging methods of disabled levels."""
+        pass
+
+    def limit(self, rate=None, sample=1, interval=60.0):
+        """Limit how often each message is logged.
+
+        Messages are told apart by their format string (the first
+        argument to :meth:`debug`, :meth:`info` and so on), so a single
+        call in a loop counts as one message whatever its arguments.
+
+        If *rate* is not ``None``, at most *rate* records per second are
+        logged for each message. If *sample* is greater than 1, only the
+        first of every *sample* calls logs each :meth:`debug` message.
+        The other calls return before a record is even created.
+
+        Every *interval* seconds (checked as messages are logged) and
+        when :meth:`report_suppressed` is called, the number of records
+        suppressed for each message is logged, and messages that weren't
+        suppressed since the last report are forgotten. That keeps the
+        table small even if format strings are built on the fly (as in
+        ``log.warning("item %d" % i)``); if it still grows past
+        :attr:`max_sites`, it is emptied. Calling :meth:`limit` with the
+        default arguments removes the limits.
+
+        Like the level check, the limits are applied by replacing a
+        method, so they cost nothing unless they are set. The counts are
+        not protected by a lock, so threads logging the same message at
+        once may let a few extra records through.
+
+        .. versionadded:: 1.1.2
+        """
+        self.rate = rate
+        self.sample = sample
+        self.report_interval = interval
+        self.next_report = timer() + interval
+        # Map each format string to a list of [start of the current
+        # second, records logged in it, calls, suppressed records, level].
+        self.sites = {}
+        if rate is None and sample <= 1:
+            self.__dict__.pop("_log", None)
+        else:
+            self._log = self.limited_log
+
+    def limited_log(self, level, msg, args, *rest, **kwargs):
+        """Stand in for :meth:`logging.Logger._log` when :meth:`limit` is used."""
+        now = timer()
+        key = msg
+        if not isinstance(key, basestring):
+            # Message instances are different each time; their format
+            # strings aren't.
+            key = getattr(key, "fmt", None) or type(key)
+        site = self.sites.get(key)
+        if site is None:
+            if len(self.sites) >= self.max_sites:
+                self.report_suppressed(now)
+            site = self.sites[key] = [now, 0, 0, 0, level]
+        site[2] += 1
+
+        if level <= logging.DEBUG and (site[2] - 1) % self.sample:
+            logged = False
+        elif self.rate is not None:
+            if now - site[0] >= 1.0:
+                site[0] = now
+                site[1] = 0
+            site[1] += 1
+            logged = site[1] <= self.rate
+        else:
+            logged = True
+
+        if not logged:
+            site[3] += 1
+        if now >= self.next_report:
+            self.report_suppressed(now)
+        if logged:
+            logging.Logger._log(self, level, msg, args, *rest, **kwargs)
+
+    def report_suppressed(self, now=None):
+        """Log the number of records suppressed by :meth:`limit` for each message.
+
+        The counts start again from zero, and messages without suppressed
+        records are forgotten.
+        """
+        sites = self.sites
+        if not sites:
+            return
+        if now is None:
+            now = timer()
+        self.next_report = now + self.report_interval
+        for key, site in list(sites.items()):
+            suppressed, level = site[3], site[4]
+            if not suppressed:
+                del sites[key]
+                continue
+            site[3] = 0
+            if self.isEnabledFor(level):
+                logging.Logger._log(self, level,
+                    "%d records suppressed for message %r", (suppressed, key))
+        if len(sites) >= self.max_sites:
+            sites.clear()
+
+    def isEnabledFor(self, level):
+        if self.manager.disable >= level:
+            return False
+        enabled = self.enabled.get(level)
+        if enabled is None:
+            return logging.Logger.isEnabledFor(self, level)
+        return enabled
 
     def setLevel(self, ns):
         """Set the logger verbosity level.
@@ -117,20 +1364,85 @@ class LoggingMixin(object):
     :class:`CommandLineLogger` and are interpreted as in the 
     :mod:`logging` package.
 
+    Messages are formatted by :attr:`formatter_factory`, by default a
+    :class:`FastFormatter`.
+
     If *root* is True, the :class:`LoggingMixin` will make itself the root
     logger. This means that, for example, code that knows nothing about
     the :class:`LoggingMixin` can inherit its verbosity level, formatters
     and handlers.
+
+    If *log_queue* is True, messages are written by a background thread
+    (see :class:`QueueHandler`) so that logging doesn't slow
+    :attr:`main` down. *log_queue* may also be the maximum number of
+    messages waiting to be written, and *log_overflow* is the
+    :class:`QueueHandler` policy for messages logged when there are
+    already that many.
+
+    If *buffer_log* is True, the log file is written by a
+    :class:`BufferedFileHandler`, which saves up messages and writes
+    them in large batches.
+
+    *log_format* is the default for the :option:`--log-format` parameter:
+    "text" uses :attr:`message_format`, "json" writes one JSON object per
+    message (see :class:`JsonFormatter`) and "binary" writes the log file
+    in a compact format that is turned into text later (see
+    :class:`BinaryFileHandler`).
+
+    *log_max_bytes* and *log_rotate* are the defaults for the
+    :option:`--log-max-bytes` and :option:`--log-rotate` parameters. If
+    either is set, the log file is written by a
+    :class:`RotatingFileHandler`, which keeps *log_backups* old files (or
+    all of them, if *log_backups* is ``None``).
+
+    If *log_aggregate* is True, processes forked by the application (the
+    workers of a :class:`cli.parallel.ParallelFilesMixin`, for example)
+    send their messages to the application's process, which writes all
+    of them (see :class:`AggregatingHandler`).
+
+    *log_rate* and *log_sample* limit how often each message is logged
+    (see :meth:`CommandLineLogger.limit`).
+
+    If *log_ring* is True, messages below the verbosity level are kept
+    in memory and written only if an error is logged, :attr:`main`
+    raises an exception or the process receives :data:`signal.SIGUSR2`
+    (see :class:`RingHandler`). *log_ring* may also be the number of
+    messages to keep.
+
+    .. versionchanged:: 1.1.2
+        Added *log_queue*, *log_overflow*, *buffer_log*, *log_format*,
+        *log_max_bytes*, *log_rotate*, *log_backups*, *log_aggregate*,
+        *log_rate*, *log_sample* and *log_ring*; the formatter is a
+        :class:`FastFormatter`.
     """
+    formatter_factory = FastFormatter
+    default_message_format = "%(asctime)s %(message)s"
+    default_date_format = "%Y-%m-%dT%H:%M:%S"
 
     def __init__(self, stream=sys.stdout, logfile=None,
-            message_format="%(asctime)s %(message)s", 
-            date_format="%Y-%m-%dT%H:%M:%S", root=True, **kwargs):
+            message_format=default_message_format,
+            date_format=default_date_format, root=True, log_queue=None,
+            log_overflow="block", buffer_log=False, log_format="text",
+            log_max_bytes=None, log_rotate=None, log_backups=None,
+            log_aggregate=False, log_rate=None, log_sample=None,
+            log_ring=None, **kwargs):
         self.logfile = logfile
         self.stream = stream
         self.message_format = message_format
         self.date_format = date_format
         self.root = root
+        self.log_queue = log_queue
+        self.log_overflow = log_overflow
+        self.buffer_log = buffer_log
+        self.log_format = log_format
+        self.log_max_bytes = log_max_bytes
+        self.log_rotate = log_rotate
+        self.log_backups = log_backups
+        self.log_aggregate = log_aggregate
+        self.log_rate = log_rate
+        self.log_sample = log_sample
+        self.log_ring = log_ring
+        self.log_handlers = []
 
     def setup(self):
         """Configure the :class:`LoggingMixin`.
@@ -138,6 +1450,10 @@ class LoggingMixin(object):
         This method adds the :option:`-l`, :option:`q`,
         :option:`-s` and :option:`-v` parameters to the
         application and instantiates the :attr:`log` attribute.
+
+        .. versionchanged:: 1.1.2
+            Added the :option:`--log-format`, :option:`--log-max-bytes` and
+            :option:`--log-rotate` parameters.
         """
         # Add logging-related options.
         self.add_param("-l", "--logfile", default=self.logfile, 
@@ -148,11 +1464,22 @@ class LoggingMixin(object):
                 action="store_true")
         self.add_param("-v", "--verbose", default=0, help="raise the verbosity",
                 action="count")
+        self.add_param("--log-format", default=self.log_format,
+                choices=("text", "json", "binary"),
+                help="write log messages as text, JSON or binary "
+                    "(default: %(default)s)")
+        self.add_param("--log-max-bytes", default=self.log_max_bytes,
+                type=int, metavar="BYTES",
+                help="start a new log file after BYTES")
+        self.add_param("--log-rotate", default=self.log_rotate,
+                choices=sorted(RotatingFileHandler.periods),
+                help="start a new log file every hour, day or week")
 
         # Create logger.
         logging.setLoggerClass(CommandLineLogger)
         self.log = logging.getLogger(self.name)
-        self.formatter = Formatter(fmt=self.message_format, datefmt=self.date_format)
+        self.formatter = self.formatter_factory(fmt=self.message_format,
+            datefmt=self.date_format)
 
         self.log.level = self.log.default_level
 
@@ -168,29 +1495,122 @@ class LoggingMixin(object):
         The application passes the :attr:`params` object
         to the :class:`CommandLineLogger`'s special
         :meth:`CommandLineLogger.setLevel` method to set the logger's
-        verbosity and then initializes the logging handlers. If the
+        verbosity, applies :attr:`log_rate` and :attr:`log_sample` (see
+        :meth:`CommandLineLogger.limit`) and then initializes the logging
+        handlers. If the
         :attr:`logfile` attribute is not ``None``, it is passed to a
-        :class:`logging.FileHandler` instance and that is added to the
+        :class:`logging.FileHandler` (or, if :attr:`buffer_log` is set,
+        :class:`BufferedFileHandler`; if the file should be rotated,
+        :class:`RotatingFileHandler`) instance and that is added to the
         handler list. Otherwise, if the :attr:`stream` attribute is
         not ``None``, it is passed to a :class:`logging.StreamHandler`
-        instance and that becomes the main handler.
+        instance and that becomes the main handler. If :attr:`log_queue`
+        is set, the main handler is wrapped in a :class:`QueueHandler`
+        (or, if :attr:`log_aggregate` is set, an
+        :class:`AggregatingHandler`). If :attr:`log_ring` is set, the
+        logger's level is lowered to :data:`logging.DEBUG` and the
+        handler is wrapped in a :class:`RingHandler` that keeps the
+        messages below the verbosity level. Since this happens before
+        :attr:`main` runs, processes it forks inherit the handlers.
+        The handler uses :attr:`formatter` or, if :option:`--log-format`
+        is "json", a :class:`JsonFormatter`. If it is "binary", the log
+        file is written by a :class:`BinaryFileHandler`. The handler is
+        kept in :attr:`log_handlers`; when the application runs again,
+        it is closed and replaced, while handlers added to the logger by
+        other code are left alone.
 
+        The time this takes is recorded in :attr:`timings` as "logging".
         """
+        started = timer()
         self.log.setLevel(self.params)
+        self.log.limit(self.log_rate, self.log_sample or 1)
 
-        self.log.handlers = []
-        if self.params.logfile is not None:
-            file_handler = FileHandler(self.params.logfile)
-            file_handler.setFormatter(self.formatter) # pragma: no cover
-            self.log.addHandler(file_handler)
+        # Stop the threads of the handlers left by an earlier run, but
+        # leave alone any that were added by someone else.
+        for handler in self.log_handlers:
+            self.log.removeHandler(handler)
+            handler.close()
+        self.log_handlers = []
+        formatter = self.formatter
+        if self.params.log_format == "json":
+            formatter = JsonFormatter(datefmt=self.date_format)
+        handler = None
+        if self.params.log_format == "binary":
+            if self.params.logfile is None or self.params.log_max_bytes or \
+                    self.params.log_rotate:
+                self.argparser.error("binary logs must be written to a "
+                    "--logfile and can't be rotated")
+            handler = BinaryFileHandler(self.params.logfile)
+        elif self.params.logfile is not None:
+            if self.params.log_max_bytes or self.params.log_rotate:
+                handler = RotatingFileHandler(self.params.logfile,
+                    max_bytes=self.params.log_max_bytes,
+                    rotate=self.params.log_rotate, backups=self.log_backups,
+                    bufsize=self.buffer_log and 64 * 1024 or 0)
+            elif self.buffer_log:
+                handler = BufferedFileHandler(self.params.logfile)
+            else:
+                handler = FileHandler(self.params.logfile)
+            handler.setFormatter(formatter)
         elif self.stream is not None:
-            stream_handler = StreamHandler(self.stream)
-            stream_handler.setFormatter(self.formatter)
-            self.log.addHandler(stream_handler)
+            handler = StreamHandler(self.stream)
+            handler.setFormatter(formatter)
+
+        if (self.log_queue or self.log_aggregate) and handler is not None:
+            kwargs = {"overflow": self.log_overflow}
+            if self.log_queue and self.log_queue is not True:
+                kwargs["capacity"] = self.log_queue
+            factory = self.log_aggregate and AggregatingHandler or QueueHandler
+            handler = factory(handler, **kwargs)
+
+        if self.log_ring and handler is not None:
+            kwargs = {"threshold": self.log.level}
+            if self.log_ring is not True:
+                kwargs["capacity"] = self.log_ring
+            handler = RingHandler(handler, **kwargs)
+            handler.start()
+            self.log.level = logging.DEBUG
 
         # The null handler simply drops all messages.
-        if not self.log.handlers:
-            self.log.addHandler(NullHandler())
+        if handler is None and not self.log.handlers:
+            handler = NullHandler()
+
+        if handler is not None:
+            self.log.addHandler(handler)
+            self.log_handlers = [handler]
+
+        self.timings["logging"] = timer() - started
+
+    def post_run(self, returned):
+        """Wait for the log handlers to finish writing.
+
+        The number of suppressed messages is logged (see
+        :meth:`CommandLineLogger.report_suppressed`) and, if *returned* is
+        an exception, the messages kept by a :class:`RingHandler` are
+        written.
+
+        .. versionadded:: 1.1.2
+        """
+        self.log.report_suppressed()
+        for handler in self.log.handlers:
+            if isinstance(returned, Exception) and \
+                    isinstance(handler, RingHandler):
+                handler.dump()
+            handler.flush()
+
+    def handle_error(self, error):
+        """Write the messages kept by a :class:`RingHandler`.
+
+        This happens when *error*, raised by :attr:`main`, is about to
+        propagate out of :meth:`cli.app.Application.run` and
+        :meth:`post_run` won't see it.
+
+        .. versionadded:: 1.1.2
+        """
+        for handler in self.log.handlers:
+            if isinstance(handler, RingHandler):
+                handler.dump()
+            handler.flush()
 
 class LoggingApp(LoggingMixin, CommandLineMixin, Application):
     """A logging application.
@@ -216,3 +1636,136 @@ class LoggingApp(LoggingMixin, CommandLineMixin, Application):
         Application.pre_run(self)
         CommandLineMixin.pre_run(self)
         LoggingMixin.pre_run(self)
+
+    def post_run(self, returned):
+        LoggingMixin.post_run(self, returned)
+        return Application.post_run(self, returned)
+
+    def handle_error(self, error):
+        Application.handle_error(self, error)
+        LoggingMixin.handle_error(self, error)
+
+    def reset(self, argv):
+        Application.reset(self, argv)
+        CommandLineMixin.reset(self, argv)
+
+def read_binary_log(f):
+    """Yield the records in *f*, written by a :class:`BinaryFileHandler`.
+
+    *f* is a file object opened in binary mode. The records are
+    :class:`logging.LogRecord` instances with the original time, level,
+    logger name, format string, arguments and traceback. A partial record
+    at the end of the file (left by a crash, for example) is ignored.
+
+    .. versionadded:: 1.1.2
+    """
+    handler = BinaryFileHandler
+    if f.read(len(handler.magic)) != handler.magic:
+        raise ValueError("not a binary log file")
+
+    def read(size):
+        data = f.read(size)
+        if len(data) < size:
+            raise EOFError
+        return data
+
+    def string():
+        return read(handler.length.unpack(read(handler.length.size))[0])
+
+    templates = {}
+    try:
+        while True:
+            tag = f.read(1)
+            if not tag:
+                break
+            elif tag == b'T':
+                header = handler.template_header
+                _, number, levelno = header.unpack(tag + read(header.size - 1))
+                name = string().decode("utf-8")
+                msg = string().decode("utf-8")
+                codes = [c for c in string().decode("ascii")]
+                layout = struct.Struct(handler.record_header + ''.join(
+                    [handler.fields[code.encode("ascii")] for code in codes]))
+                templates[number] = (name, levelno, msg, layout, codes)
+            elif tag in (b'R', b'X'):
+                raw = read(handler.length.size)
+                name, levelno, msg, layout, codes = \
+                    templates[handler.length.unpack(raw)[0]]
+                values = layout.unpack(tag + raw + read(layout.size - 5))
+                created, values = values[2], list(values[3:])
+                args = []
+                for code in codes:
+                    if code == 'n':
+                        args.append(None)
+                        continue
+                    value = values.pop(0)
+                    if code == 'b':
+                        value = read(value)
+                    elif code == 's':
+                        value = read(value).decode("utf-8", "replace")
+                    args.append(value)
+                exc_text = None
+                if tag == b'X':
+                    exc_text = string().decode("utf-8")
+                yield logging.makeLogRecord({"name": name, "levelno": levelno,
+                    "levelname": logging.getLevelName(levelno), "msg": msg,
+                    "args": tuple(args), "created": created,
+                    "msecs": (created - int(created)) * 1000,
+                    "exc_text": exc_text})
+            else:
+                raise ValueError("unknown record type: %r" % tag)
+    except EOFError:
+        pass
+
+def decode_log(app):
+    formatter = FastFormatter(fmt=app.params.format,
+        datefmt=app.params.date_format)
+    stdout = app.stdout
+    for path in app.params.files:
+        f = open(path, 'rb')
+        try:
+            for record in read_binary_log(f):
+                line = formatter.format(record) + "\n"
+                try:
+                    stdout.write(line)
+                except UnicodeError:
+                    # A byte stream that can't take non-ASCII text (a pipe,
+                    # for example); encode it as logging.StreamHandler does.
+                    encoding = getattr(stdout, "encoding", None) or "utf-8"
+                    stdout.flush()
+                    getattr(stdout, "buffer", stdout).write(
+                        line.encode(encoding, "replace"))
+        finally:
+            f.close()
+
+def decoder(**kwargs):
+    """Return the :command:`cli-decode-log` application.
+
+    The application writes the records in the files written by
+    :class:`BinaryFileHandler` that are named on its command line to
+    standard output, formatted like the messages of a
+    :class:`LoggingMixin` (or as given by its :option:`--format` and
+    :option:`--date-format` parameters). *kwargs* are passed to
+    :class:`cli.app.CommandLineApp`.
+
+    .. versionadded:: 1.1.2
+    """
+    kwargs.setdefault("name", "cli-decode-log")
+    kwargs.setdefault("description", "write binary log files as text")
+    app = CommandLineApp(decode_log, **kwargs)
+    app.add_param("files", nargs="+", metavar="FILE",
+        help="file written by BinaryFileHandler")
+    app.add_param("-f", "--format",
+        default=LoggingMixin.default_message_format,
+        help="message format (default: %(default)s)")
+    app.add_param("-d", "--date-format",
+        default=LoggingMixin.default_date_format,
+        help="date format (default: %(default)s)")
+    return app
+
+def decode_main():
+    """Run :func:`decoder`; the entry point of :command:`cli-decode-log`.
+
+    .. versionadded:: 1.1.2
+    """
+    decoder().run()
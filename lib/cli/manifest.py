@@ -0,0 +1,206 @@
+"""\
+:mod:`cli.manifest` -- incremental application runs
+---------------------------------------------------
+
+Applications that turn input files into output files can skip work that
+has already been done, the way :command:`make` does. The
+:class:`Manifest` records the state of the inputs after each successful
+run (and, optionally, after each item processed by :attr:`main`) so that
+the next run only redoes what is out of date.
+
+.. versionadded:: 1.1.2
+"""
+
+__license__ = """Copyright (c) 2008-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""
+
+import json
+import os
+
+from cli.util import digest, fingerprint
+
+__all__ = ["Manifest"]
+
+class Manifest(object):
+    """A record of the inputs seen by an application's last run.
+
+    Pass a :class:`Manifest` to the :class:`cli.app.Application`
+    constructor as *manifest* and declare the application's input and
+    output files with the *input* and *output* arguments to
+    :meth:`cli.app.CommandLineMixin.add_param`. Before calling
+    :attr:`main`, the application checks whether the run is up to date:
+    every output exists and is newer than every input, and the
+    parameters and input fingerprints (see :func:`cli.util.fingerprint`)
+    match those recorded after the last successful run. If so,
+    :attr:`main` is skipped and the run succeeds immediately. When
+    :attr:`main` returns 0 (or ``None``), the new state is recorded.
+
+    :attr:`main` may also track its progress item by item. :meth:`stale`
+    filters a list of items (usually input file names) down to those
+    that changed since they were last passed to :meth:`done`, which
+    records each item as soon as it has been processed. A run that fails
+    half way through will therefore only redo the remaining items next
+    time::
+
+        def main(app):
+            for name in app.manifest.stale(app.params.files):
+                process(name)
+                app.manifest.done(name)
+
+    *path* is the file where the manifest is kept. By default, it is
+    ".<name>.manifest" in the current directory, where <name> is the
+    application's name.
+
+    *exclude* is a sequence of parameter names that don't affect the
+    outputs and shouldn't invalidate them when they change.
+
+    If *content* is False, inputs are compared by size and modification
+    time only; otherwise, their contents are hashed, too.
+    """
+
+    def __init__(self, path=None, exclude=(), content=True):
+        self.path = path
+        self.exclude = set(exclude)
+        self.content = content
+        self.state = None
+
+    def fingerprint(self, path):
+        fp = fingerprint(path, self.content)
+        if fp is not None:
+            fp = list(fp)
+        return fp
+
+    def key(self, app):
+        """Return a string identifying *app*'s parameters."""
+        params = getattr(app, "params", None)
+        if params is not None:
+            params = sorted((k, v) for k, v in params._get_kwargs()
+                if k not in self.exclude)
+        return digest((app.name, app.version, params))
+
+    def load(self, app):
+        """Read the manifest for *app*.
+
+        The manifest is a series of JSON objects, one per line. Later
+        lines override earlier ones. Items recorded under different
+        parameters are discarded.
+        """
+        if self.path is None:
+            self.path = ".%s.manifest" % app.name
+        key = self.key(app)
+        self.state = state = {"key": key, "inputs": None, "items": {}}
+        try:
+            f = open(self.path)
+        except IOError:
+            return state
+        try:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Probably a partial line left by a crash.
+                    continue
+                if entry.get("key") != key:
+                    state["inputs"] = None
+                    state["items"] = {}
+                    continue
+                if "inputs" in entry:
+                    state["inputs"] = entry["inputs"]
+                if "item" in entry:
+                    state["items"][entry["item"]] = entry["fingerprint"]
+        finally:
+            f.close()
+        return state
+
+    def append(self, entry):
+        entry["key"] = self.state["key"]
+        f = open(self.path, 'a')
+        try:
+            f.write(json.dumps(entry) + "\n")
+        finally:
+            f.close()
+
+    def inputs(self, app):
+        input_paths = getattr(app, "input_paths", lambda: [])
+        return dict((path, self.fingerprint(path)) for path in input_paths())
+
+    def uptodate(self, app):
+        """Return True if *app*'s outputs don't need to be rebuilt."""
+        state = self.load(app)
+        output_paths = getattr(app, "output_paths", lambda: [])()
+        try:
+            mtimes = [os.stat(path).st_mtime for path in output_paths]
+        except OSError:
+            # An output is missing, so the items that went into it must
+            # be redone, too.
+            state["items"] = {}
+            return False
+        if not mtimes or state["inputs"] != self.inputs(app):
+            return False
+        oldest = min(mtimes)
+        for path, fp in state["inputs"].items():
+            if fp is None:
+                # A missing input; leave it to main to complain.
+                return False
+            try:
+                if os.stat(path).st_mtime > oldest:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def stale(self, items):
+        """Return the *items* that changed since they were passed to :meth:`done`."""
+        recorded = self.state["items"]
+        return [item for item in items
+            if recorded.get(item) is None or
+                recorded.get(item) != self.fingerprint(item)]
+
+    def done(self, item):
+        """Record that *item* has been processed."""
+        fp = self.fingerprint(item)
+        self.state["items"][item] = fp
+        self.append({"item": item, "fingerprint": fp})
+
+    def commit(self, app):
+        """Record the state of *app*'s inputs after a successful run.
+
+        The manifest is rewritten from scratch, compacting the item log.
+        """
+        entry = {"key": self.state["key"], "inputs": self.inputs(app)}
+        tmp = self.path + ".tmp"
+        f = open(tmp, 'w')
+        try:
+            f.write(json.dumps(entry) + "\n")
+            for item, fp in sorted(self.state["items"].items()):
+                f.write(json.dumps(
+                    {"key": entry["key"], "item": item, "fingerprint": fp}) + "\n")
+        finally:
+            f.close()
+        os.rename(tmp, self.path)
+
+    def call(self, app, args):
+        """Call *app*'s :attr:`main` with *args*, unless it is up to date."""
+        if self.uptodate(app):
+            return 0
+        cache = getattr(app, "cache", None)
+        if cache is not None:
+            returned = cache.call(app, args)
+        else:
+            returned = app.main(*args)
+        if returned is None or returned == 0:
+            self.commit(app)
+        return returned
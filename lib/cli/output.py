@@ -0,0 +1,146 @@
+"""\
+:mod:`cli.output` -- buffered application output
+------------------------------------------------
+
+Applications that write many small chunks of output (one line per
+record, for example) spend much of their time in the underlying
+:meth:`write` calls. The :class:`OutputWriter` collects those chunks
+and hands them to the real stream in large batches.
+
+.. versionadded:: 1.1.2
+"""
+
+__license__ = """Copyright (c) 2008-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""
+
+import errno
+import os
+
+__all__ = ["OutputWriter", "isbrokenpipe", "silence"]
+
+def isbrokenpipe(e):
+    """Return True if the exception *e* was caused by a closed pipe."""
+    return getattr(e, "errno", None) == errno.EPIPE
+
+def silence(stream):
+    """Point *stream*'s file descriptor at :data:`os.devnull`.
+
+    Anything still buffered in *stream* (or written to it later) is
+    discarded instead of raising another error when it is flushed.
+    Streams without a file descriptor are left alone.
+    """
+    try:
+        fd = os.open(os.devnull, os.O_WRONLY)
+        try:
+            os.dup2(fd, stream.fileno())
+        finally:
+            os.close(fd)
+    except (AttributeError, IOError, OSError, ValueError):
+        pass
+
+class OutputWriter(object):
+    """A file-like object that batches writes to *stream*.
+
+    *stream* is the file object that will eventually receive the output.
+
+    *bufsize* is the number of characters that will be collected before
+    they are written to *stream*.
+
+    *policy* controls when the buffer is flushed. If it is "line", the
+    buffer is flushed whenever a newline is written (which is what
+    interactive users expect); if it is "block", the buffer is only
+    flushed when it grows larger than *bufsize* or when :meth:`flush` is
+    called explicitly. If *policy* is ``None`` (default), "line" is used
+    when *stream* is a terminal and "block" otherwise.
+
+    If the reader on the other end of *stream* goes away (as when the
+    application's output is piped to :command:`head`), :meth:`flush`
+    points the stream's file descriptor at :data:`os.devnull` so that
+    later flushes (including the one the interpreter does at exit) are
+    quiet, sets :attr:`broken` and reraises the original error.
+    :meth:`cli.app.Application.run` turns that error into a clean exit.
+    """
+    policies = ("line", "block")
+
+    def __init__(self, stream, bufsize=64 * 1024, policy=None):
+        if policy is None:
+            policy = self.isatty(stream) and "line" or "block"
+        if policy not in self.policies:
+            raise ValueError("unknown flush policy: %r" % policy)
+        self.stream = stream
+        self.bufsize = bufsize
+        self.policy = policy
+        self.broken = False
+        self.buffer = []
+        self.size = 0
+        if policy == "block":
+            self.write = self.write_block
+
+
+    def isatty(self, stream=None):
+        """Return True if *stream* (or :attr:`stream`) is a terminal."""
+        if stream is None:
+            stream = self.stream
+        isatty = getattr(stream, "isatty", None)
+        return callable(isatty) and isatty()
+
+    def fileno(self):
+        return self.stream.fileno()
+
+    def write(self, s):
+        """Add *s* to the buffer, flushing it if the policy requires."""
+        self.buffer.append(s)
+        self.size += len(s)
+        if self.size >= self.bufsize or "\n" in s:
+            self.flush()
+
+    def write_block(self, s):
+        # Installed as write() under the "block" policy to keep the
+        # common case free of the newline check.
+        self.buffer.append(s)
+        self.size += len(s)
+        if self.size >= self.bufsize:
+            self.flush()
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        """Write the buffer to :attr:`stream` in a single call."""
+        buffer, self.buffer, self.size = self.buffer, [], 0
+        if self.broken:
+            return
+        try:
+            if buffer:
+                self.stream.write(''.join(buffer))
+            self.stream.flush()
+        except (IOError, OSError) as e:
+            if not isbrokenpipe(e):
+                raise
+            self.silence()
+            raise
+
+    def silence(self):
+        """Discard all further output."""
+        self.broken = True
+        silence(self.stream)
+
+    def close(self):
+        self.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
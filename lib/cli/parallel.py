@@ -0,0 +1,300 @@
+"""\
+:mod:`cli.parallel` -- multi-process applications
+-------------------------------------------------
+
+Many applications take a list of files and handle each one
+independently. The :class:`ParallelFilesMixin` spreads that work over
+several processes while keeping the output in the order the files were
+given on the command line. Numeric results can be accumulated in shared
+memory with an :class:`Aggregator` instead of being sent back to the
+parent process.
+
+.. versionadded:: 1.1.2
+"""
+
+__license__ = """Copyright (c) 2008-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""
+
+import bisect
+import os
+import traceback
+
+from cli.app import CommandLineMixin, Application
+from cli.util import StringIO
+
+__all__ = ["Aggregator", "ParallelFilesApp", "ParallelFilesMixin"]
+
+# The application running in this process. Workers inherit it when the
+# pool forks, so the application itself never has to be pickled.
+_app = None
+
+def process(job):
+    """Run the per-file handler for *job* in a worker process.
+
+    *job* is an (index, path) tuple. Returns (index, output, status).
+    """
+    index, path = job
+    stdout = StringIO()
+    try:
+        status = _app.process_file(path, stdout)
+    except Exception:
+        stdout.write(traceback.format_exc())
+        status = 1
+    if status is None:
+        status = 0
+    return index, stdout.getvalue(), status
+
+def attach():
+    """Give this worker process its own slot in the application's :class:`Aggregator`."""
+    _app.aggregator.attach()
+
+class Aggregator(object):
+    """Counters, sums, histograms and arrays shared by worker processes.
+
+    Metrics are kept in :func:`multiprocessing.RawArray` shared memory,
+    which forked workers inherit. Each process writes only to its own
+    slot (a row in each array), so updates need no locks; :meth:`reduce`
+    adds the rows together in the parent once the workers are done.
+
+    *slots* is the number of worker processes that will :meth:`attach`.
+    Slot 0 belongs to the process that created the :class:`Aggregator`.
+
+    Metrics must be declared (with :meth:`counter`, :meth:`sum`,
+    :meth:`histogram` and :meth:`array`) before the workers are started.
+    """
+
+    def __init__(self, slots):
+        import multiprocessing
+        self.slots = slots
+        self.slot = 0
+        self.metrics = {}
+        self.names = []
+        self.attached = multiprocessing.Value('i', 0)
+
+    def declare(self, name, kind, typecode, width, bins=None):
+        import multiprocessing
+        if name in self.metrics:
+            raise ValueError("metric already declared: %r" % name)
+        values = multiprocessing.RawArray(typecode, (self.slots + 1) * width)
+        self.metrics[name] = (kind, width, values, bins)
+        self.names.append(name)
+
+    def counter(self, name):
+        """Declare an integer counter."""
+        self.declare(name, "counter", 'l', 1)
+
+    def sum(self, name):
+        """Declare a floating point sum."""
+        self.declare(name, "sum", 'd', 1)
+
+    def histogram(self, name, bins):
+        """Declare a histogram.
+
+        *bins* is a sorted sequence of bin edges. Values below the first
+        edge are counted in the first bin and values at or above the last
+        edge in the last, so the histogram has ``len(bins) + 1`` counts.
+        """
+        bins = list(bins)
+        self.declare(name, "histogram", 'l', len(bins) + 1, bins)
+
+    def array(self, name, typecode, size):
+        """Declare an array of *size* elements summed element-wise.
+
+        *typecode* is an :mod:`array` type code such as 'l' or 'd'.
+        """
+        self.declare(name, "array", typecode, size)
+
+    def attach(self):
+        """Claim a slot for the current (worker) process."""
+        lock = self.attached.get_lock()
+        lock.acquire()
+        try:
+            self.attached.value += 1
+            slot = self.attached.value
+        finally:
+            lock.release()
+        if slot > self.slots:
+            raise RuntimeError("no aggregator slots left (%d)" % self.slots)
+        self.slot = slot
+
+    def add(self, name, value=1):
+        """Add *value* to the counter or sum *name*."""
+        kind, width, values, bins = self.metrics[name]
+        values[self.slot] += value
+
+    def observe(self, name, value):
+        """Count *value* in the histogram *name*."""
+        kind, width, values, bins = self.metrics[name]
+        values[self.slot * width + bisect.bisect_right(bins, value)] += 1
+
+    def add_array(self, name, values):
+        """Add the sequence *values* element-wise to the array *name*."""
+        kind, width, shared, bins = self.metrics[name]
+        offset = self.slot * width
+        for i, value in enumerate(values):
+            shared[offset + i] += value
+
+    def reduce(self):
+        """Return a dictionary mapping each metric to its combined value.
+
+        Counters and sums are numbers; histograms and arrays are lists.
+        """
+        result = {}
+        for name in self.names:
+            kind, width, values, bins = self.metrics[name]
+            totals = [sum(values[slot * width + i]
+                for slot in range(self.slots + 1)) for i in range(width)]
+            if kind in ("counter", "sum"):
+                totals = totals[0]
+            result[name] = totals
+        return result
+
+class ParallelFilesMixin(object):
+    """A command-line application that processes files in parallel.
+
+    The :class:`ParallelFilesMixin` requires
+    :class:`cli.app.CommandLineMixin`. It provides a :meth:`main` that
+    calls :meth:`process_file` once for each file named by the parameter
+    in :attr:`files_param`; subclasses only need to implement
+    :meth:`process_file`. In addition to those supported by the standard
+    :class:`cli.app.Application` and :class:`cli.app.CommandLineMixin`,
+    arguments are:
+
+    *jobs* is the default number of worker processes (the :option:`-j`
+    parameter). If it is 1, files are processed in the application's own
+    process.
+
+    Workers are started with :func:`os.fork` (by
+    :class:`multiprocessing.Pool`), so the application and everything it
+    set up are available to :meth:`process_file` without being pickled.
+    Larger files are handed out first so that one big file at the end of
+    the list doesn't keep a single worker busy after the others finish.
+
+    Before the files are processed, :meth:`declare_aggregates` is given a
+    fresh :class:`Aggregator`, which is also stored at :attr:`aggregator`
+    so that :meth:`process_file` can update it. When all files are done,
+    the combined values are stored at :attr:`aggregates`.
+    """
+    files_param = "files"
+    """The name of the parameter that holds the list of files."""
+    aggregator = None
+    aggregates = None
+
+    def __init__(self, jobs=1, **kwargs):
+        self.jobs = jobs
+
+    def setup(self):
+        """Configure the :class:`ParallelFilesMixin`.
+
+        This method adds the :option:`-j` parameter to the application.
+        """
+        self.add_param("-j", "--jobs", default=self.jobs, type=int,
+            help="number of files to process at once (default: %(default)s)")
+
+    def process_file(self, path, stdout):
+        """Process a single file.
+
+        *path* is the name of the file and *stdout* is a file-like object
+        for the output about that file. The return value is the status for
+        the file (``None`` means 0). If this method raises an exception,
+        the traceback is written to *stdout* and the status is 1.
+        """
+        raise NotImplementedError
+
+    def declare_aggregates(self, aggregator):
+        """Declare the metrics :meth:`process_file` will update.
+
+        The base implementation declares nothing.
+        """
+        pass
+
+    def main(self):
+        """Process all files, returning the highest status."""
+        return self.process_files(self.param_paths([self.files_param]))
+
+    def process_files(self, paths):
+        """Process *paths*, writing their output to :attr:`stdout` in order.
+
+        Returns the highest status returned for any file.
+        """
+        global _app
+        _app = self
+
+        jobs = [(index, path) for index, path in enumerate(paths)]
+        workers = min(self.params.jobs, len(jobs))
+        self.aggregator = Aggregator(max(workers, 1))
+        self.declare_aggregates(self.aggregator)
+        try:
+            return self.dispatch(jobs, workers)
+        finally:
+            self.aggregates = self.aggregator.reduce()
+
+    def dispatch(self, jobs, workers):
+        if workers <= 1:
+            return self.collect(process(job) for job in jobs)
+
+        def size(job):
+            try:
+                return os.path.getsize(job[1])
+            except OSError:
+                return 0
+        jobs.sort(key=size, reverse=True)
+
+        import multiprocessing
+        pool = multiprocessing.Pool(workers, initializer=attach)
+        try:
+            status = self.collect(
+                pool.imap_unordered(process, jobs, chunksize=1))
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+        return status
+
+    def collect(self, results):
+        """Write *results* to :attr:`stdout` in order; return the highest status."""
+        pending = {}
+        next = 0
+        status = 0
+        for index, output, result in results:
+            pending[index] = output
+            status = max(status, result)
+            while next in pending:
+                self.stdout.write(pending.pop(next))
+                next += 1
+        return status
+
+class ParallelFilesApp(ParallelFilesMixin, CommandLineMixin, Application):
+    """A command-line application that processes files in parallel.
+
+    This class simply glues together the base :class:`cli.app.Application`,
+    :class:`ParallelFilesMixin` and other mixins that provide necessary
+    functionality.
+    """
+
+    def __init__(self, main=None, **kwargs):
+        ParallelFilesMixin.__init__(self, **kwargs)
+        CommandLineMixin.__init__(self, **kwargs)
+        Application.__init__(self, main, **kwargs)
+
+    def setup(self):
+        Application.setup(self)
+        CommandLineMixin.setup(self)
+        ParallelFilesMixin.setup(self)
+
+    def reset(self, argv):
+        Application.reset(self, argv)
+        CommandLineMixin.reset(self, argv)
@@ -0,0 +1,164 @@
+"""\
+:mod:`cli.progress` -- progress reports for long-running applications
+---------------------------------------------------------------------
+
+Batch applications often run for a long time without saying anything.
+A :class:`Progress` counter costs one integer increment per item and
+can show a status line on a terminal or report the application's rate
+and expected completion time when the process receives a signal.
+
+.. versionadded:: 1.1.2
+"""
+
+__license__ = """Copyright (c) 2008-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""
+
+import signal
+import sys
+
+try:
+    from time import perf_counter as timer
+except ImportError:
+    from time import time as timer
+
+__all__ = ["Progress"]
+
+default_signals = [getattr(signal, name) for name in ("SIGUSR1", "SIGINFO")
+    if hasattr(signal, name)]
+
+class Progress(object):
+    """Count the items an application has processed.
+
+    Call the :class:`Progress` instance (or add to :attr:`count`) once
+    per item; that is all the work done on the application's hot path.
+    Everything else happens between :meth:`start` and :meth:`stop`, which
+    :meth:`cli.app.Application.run` calls around :attr:`main`.
+
+    *stream* is where reports are written (default: :data:`sys.stderr`).
+    If *log* is not ``None``, signal reports go to its :meth:`info` method
+    instead.
+
+    *total* is the number of items expected, if known. It may also be set
+    later through the :attr:`total` attribute, and is used to estimate
+    the time remaining.
+
+    If *interactive* is True, a background thread redraws a status line
+    on *stream* every *interval* seconds. If it is ``None`` (default), the
+    status line is shown only when *stream* is a terminal.
+
+    *signals* is a sequence of signal numbers that make the application
+    write a report. By default, these are :data:`signal.SIGUSR1` and, on
+    systems that have it, :data:`signal.SIGINFO` (sent by typing Ctrl-T).
+    """
+
+    def __init__(self, stream=None, log=None, total=None, interactive=None,
+            interval=0.5, signals=None):
+        self.stream = stream is None and sys.stderr or stream
+        self.log = log
+        self.total = total
+        self.interactive = interactive
+        self.interval = interval
+        if signals is None:
+            signals = default_signals
+        self.signals = signals
+        self.count = 0
+        self.started = None
+        self.handlers = {}
+        self.thread = None
+        self.stopped = None
+
+    def __call__(self, n=1):
+        """Record that *n* more items were processed."""
+        self.count += n
+
+    def start(self):
+        """Start the clock, install signal handlers and the status line.
+
+        The count starts again from zero, so that each run of an
+        application (see :meth:`cli.app.Application.run_many`) reports
+        only its own items.
+        """
+        self.count = 0
+        self.started = timer()
+        for signum in self.signals:
+            try:
+                self.handlers[signum] = signal.signal(signum, self.dump)
+            except ValueError: # pragma: no cover
+                # Not in the main thread.
+                pass
+
+        interactive = self.interactive
+        if interactive is None:
+            isatty = getattr(self.stream, "isatty", None)
+            interactive = callable(isatty) and isatty()
+        if interactive:
+            import threading
+            self.stopped = threading.Event()
+            self.thread = threading.Thread(target=self.refresh)
+            self.thread.daemon = True
+            self.thread.start()
+
+    def stop(self):
+        """Undo :meth:`start`."""
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+            self.stream.write("\r\033[K")
+        for signum, handler in self.handlers.items():
+            signal.signal(signum, handler)
+        self.handlers = {}
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return timer() - self.started
+
+    def report(self):
+        """Return a one-line summary of the progress so far."""
+        elapsed = self.elapsed()
+        count = self.count
+        rate = elapsed and count / elapsed or 0.0
+        summary = "%d" % count
+        if self.total:
+            summary += "/%d (%.1f%%)" % (self.total, 100.0 * count / self.total)
+        summary += " items, %.1f/s, %.1fs elapsed" % (rate, elapsed)
+        if self.total and rate:
+            summary += ", ETA %.1fs" % (max(self.total - count, 0) / rate)
+        return summary
+
+    def dump(self, signum=None, frame=None):
+        """Write :meth:`report` to :attr:`log` or :attr:`stream`."""
+        report = self.report()
+        if self.log is not None:
+            self.log.info(report)
+        else:
+            self.stream.write(u"%s\n" % report)
+            self.stream.flush()
+
+    def refresh(self):
+        last = None
+        stopped = self.stopped
+        while True:
+            # Event.wait() only returns the flag on Python 2.7 and later.
+            stopped.wait(self.interval)
+            if stopped.is_set():
+                return
+            if self.count == last:
+                continue
+            last = self.count
+            self.stream.write(u"\r\033[K%s" % self.report())
+            self.stream.flush()
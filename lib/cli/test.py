@@ -36,7 +36,6 @@ except ImportError:
     import unittest
 
 from cli.app import Abort
-from cli.ext import scripttest
 from cli.util import StringIO, trim
 
 __all__ = ["AppTest", "FunctionalTest"]
@@ -191,7 +190,13 @@ class FunctionalTest(unittest.TestCase):
         :meth:`setUp` instantiates the
         :class:`scripttest.TestFileEnvironment` and stores it at
         :attr:`env`.
+
+        .. versionchanged:: 1.1.2
+            :mod:`scripttest` is imported here rather than when
+            :mod:`cli.test` is imported.
         """
+        from cli.ext import scripttest
+
         self._testdir = self.testdir
         if self._testdir is None:
             self._testdir = mkdtemp(prefix="functests-")
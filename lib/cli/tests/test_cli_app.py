@@ -15,11 +15,30 @@ ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
 OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 """
 
-from cli.app import Abort, Application, CommandLineApp
+import os
+import subprocess
+import sys
+
+import cli
+from cli.app import Abort, Application, CommandLineApp, Namespace
 from cli.util import StringIO
 
 from cli import tests
 
+def run_python(*args):
+    """Run a new interpreter that can import :mod:`cli`.
+
+    Returns (returncode, stdout, stderr).
+    """
+    env = os.environ.copy()
+    libdir = os.path.dirname(os.path.dirname(cli.__file__))
+    env["PYTHONPATH"] = os.pathsep.join(
+        [libdir] + env.get("PYTHONPATH", "").split(os.pathsep))
+    proc = subprocess.Popen([sys.executable] + list(args), env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = proc.communicate()
+    return proc.returncode, stdout.decode(), stderr.decode()
+
 class FakeApp(Application):
     
     def main(self):
@@ -70,6 +89,89 @@ class TestApplication(tests.AppTest):
 
         self.assertRaises(RuntimeError, app.run)
 
+    def test_run_many(self):
+        seen = []
+        @self.app_cls(exit_after_main=False, stderr=StringIO(), argv=["main"])
+        def app(app):
+            seen.append(app.argv[1:])
+            if app.argv[1:] == ["fail"]:
+                raise RuntimeError("Just testing.")
+            elif app.argv[1:] == ["abort"]:
+                raise Abort(3)
+            return len(app.argv) - 1
+
+        statuses = app.run_many([["a", "b"], "fail", "", "# comment\n",
+            "abort", "c 'd e'\n"])
+        self.assertEqual(statuses, [2, 1, 3, 2])
+        self.assertEqual(seen, [["a", "b"], ["fail"], ["abort"], ["c", "d e"]])
+        self.assertTrue("RuntimeError" in app.stderr.getvalue())
+        self.assertEqual(app.argv, ["main"])
+
+    def test_timings(self):
+        self.app.run()
+        for phase in ("setup", "pre_run", "main"):
+            self.assertTrue(self.app.timings[phase] >= 0)
+        self.assertFalse("post_run" in self.app.timings)
+
+    def test_gc_policy(self):
+        import gc
+        @self.app_cls(exit_after_main=False, gc_policy="disable",
+            gc_threshold=(10000, 20, 20))
+        def app(app):
+            return int(gc.isenabled()) + 2 * (gc.get_threshold()[0] != 10000)
+
+        threshold = gc.get_threshold()
+        # Objects frozen by someone else stay frozen.
+        unfreeze = getattr(gc, "unfreeze", None)
+        calls = []
+        gc.unfreeze = lambda: calls.append(1)
+        try:
+            self.assertEqual(app.run(), 0)
+        finally:
+            if unfreeze is None:
+                del gc.unfreeze
+            else:
+                gc.unfreeze = unfreeze
+        self.assertEqual(calls, [])
+        self.assertTrue(gc.isenabled())
+        self.assertEqual(gc.get_threshold(), threshold)
+
+    def test_gc_policy_error(self):
+        import gc
+        @self.app_cls(exit_after_main=False, gc_policy="disable")
+        def app(app):
+            raise RuntimeError("failed")
+
+        self.assertRaises(RuntimeError, app.run)
+        self.assertTrue(gc.isenabled())
+
+    def test_fast_exit(self):
+        returncode, stdout, stderr = run_python("-c", "\n".join([
+            "import atexit, cli.app, sys",
+            "atexit.register(lambda: sys.stdout.write('atexit'))",
+            "@cli.app.Application(fast_exit=True, buffer_output=True)",
+            "def app(app):",
+            "    app.stdout.write('out')",
+            "    return 3",
+            "app.run()",
+        ]))
+        self.assertEqual((returncode, stdout, stderr), (3, "out", ""))
+
+    def test_timeout(self):
+        import time
+        @self.app_cls(exit_after_main=False, timeout=0.05)
+        def app(app):
+            self.assertTrue(0 < app.remaining() <= 0.05)
+            time.sleep(1)
+
+        self.assertEqual(app.run(), 124)
+        self.assertEqual(app.remaining(), 0.0)
+
+        app.timeout = None
+        app.main = lambda app: None
+        self.assertEqual(app.run(), 0)
+        self.assertEqual(app.remaining(), None)
+
     def test_swallow_exception(self):
         @self.app_cls(exit_after_main=False, reraise=(ValueError, TypeError))
         def app(app):
@@ -102,6 +204,155 @@ class TestCommandLineApp(tests.AppTest):
             status = e.status
         self.assertEqual(status, 0)
 
+    def test_run_many(self):
+        app_cls = self.app_cls
+        class Test(app_cls):
+
+            def setup(self):
+                app_cls.setup(self)
+                self.add_param("-f", "--foo", default=None)
+
+            def main(self):
+                return len(self.params.foo or "")
+
+        _, app = self.runapp(Test, "test -f bar", stderr=StringIO())
+        self.assertEqual(app.run_many([["-f", "ab"], [], ["-x"]]), [2, 0, 2])
+
+    def test_shell(self):
+        app_cls = self.app_cls
+        class Test(app_cls):
+            loaded = 0
+
+            def setup(self):
+                app_cls.setup(self)
+                commands = self.argparser.add_subparsers()
+                add = commands.add_parser("add")
+                add.add_argument("n", type=int)
+                add.set_defaults(command=self.add)
+                show = commands.add_parser("show")
+                show.set_defaults(command=self.show)
+                self.total = 0
+
+            def add(self):
+                self.total += self.params.n
+
+            def show(self):
+                self.stdout.write("%d\n" % self.total)
+                return self.total
+
+            def main(self):
+                return self.params.command()
+
+        stdin = StringIO(u"add 2\n\n# comment\nadd 3\nshow\nquit\nshow\n")
+        _, app = self.runapp(Test, "test show", stdin=stdin, stderr=StringIO())
+        app.stdout = StringIO()
+        self.assertEqual(app.shell(), 5)
+        self.assertEqual(app.stdout.getvalue(), "5\n")
+
+        app.stdin = StringIO(u"add x\n")
+        self.assertEqual(app.shell(), 2)
+        self.assertTrue("invalid int value" in app.stderr.getvalue())
+
+    def test_lazy_params(self):
+        app_cls = self.app_cls
+        converted = []
+        def number(value):
+            converted.append(value)
+            return int(value)
+
+        class Test(app_cls):
+
+            def setup(self):
+                app_cls.setup(self)
+                self.add_param("-n", default="1", type=number, lazy=True)
+                self.add_param("-m", nargs="*", default=[], type=number,
+                    lazy=True)
+                self.add_param("-x", default=None, type=number, lazy=True)
+
+            def main(self):
+                self.raw = self.params._get_kwargs()
+                params = self.update_params(Namespace(), self.params)
+                return params.n + sum(params.m)
+
+        status, app = self.runapp(Test, "test -m 2 3", stderr=StringIO())
+        self.assertEqual(app.raw, [("m", ["2", "3"]), ("n", "1"), ("x", None)])
+        self.assertEqual(status, 6)
+        self.assertEqual(converted, ["1", "2", "3"])
+        self.assertEqual(app.params.x, None)
+        self.assertEqual(app.params.n, 1)
+        self.assertEqual(converted, ["1", "2", "3", "1"])
+
+        self.assertEqual(app.run_many(["-n five"]), [2])
+        self.assertTrue("argument -n: invalid number value: 'five'" in
+            app.stderr.getvalue())
+
+    def test_params_vars(self):
+        app_cls = self.app_cls
+
+        class Test(app_cls):
+
+            def setup(self):
+                app_cls.setup(self)
+                self.add_param("-n", default=1, type=int)
+
+            def main(self):
+                def f(n):
+                    return n
+                return f(**vars(self.params))
+
+        status, app = self.runapp(Test, "test -n 3")
+        self.assertEqual(status, 3)
+        self.assertEqual(vars(app.params), {"n": 3})
+
+    def test_stats(self):
+        status, app = self.runapp(self.app_cls, "test", stats=True)
+        self.assertEqual(app.stderr.getvalue(), "")
+
+        status, app = self.runapp(self.app_cls, "test --stats", stats=True)
+        self.assertTrue(": main_time " in app.stderr.getvalue())
+
+        status, app = self.runapp(self.app_cls, "test --stats json", stats=True)
+        import json
+        stats = json.loads(app.stderr.getvalue())
+        self.assertTrue("parse_time" in stats)
+        self.assertTrue("post_run_time" in stats)
+
+    def test_timeout_param(self):
+        status, app = self.runapp(self.app_cls, "test --timeout 2.5", timeout=0)
+        self.assertEqual(app.timeout, 2.5)
+        self.assertEqual(status, 0)
+
     def test_version(self):
         self.app.version = "0.1"
         self.app.run()
+
+class TestImportTime(tests.BaseTest):
+    module = "cli.app"
+    unwanted = ["cli.ext", "cli.profiler", "cli.test", "cli._ext.scripttest",
+        "cProfile", "pstats", "shlex", "shutil", "subprocess"]
+    budget = 0.05
+    """Cumulative import time allowed for :attr:`module`, in seconds."""
+
+    def python(self, *args):
+        returncode, stdout, stderr = run_python(*args)
+        self.assertEqual(returncode, 0, stderr)
+        return stdout, stderr
+
+    def test_unwanted_modules(self):
+        stdout, _ = self.python("-c", "import sys, %s; "
+            "sys.stdout.write(' '.join(sys.modules))" % self.module)
+        loaded = set(stdout.split())
+        for name in self.unwanted:
+            self.assertFalse(name in loaded,
+                "importing %s loads %s" % (self.module, name))
+
+    def test_budget(self):
+        # Time the import in a fresh interpreter, where nothing has been
+        # imported yet. Take the best of a few runs; the first one may
+        # compile bytecode.
+        code = ("import sys, time; started = time.time(); import %s; "
+            "sys.stdout.write('%%f' %% (time.time() - started))" % self.module)
+        best = min([float(self.python("-c", code)[0]) for i in range(3)])
+        self.assertTrue(best < self.budget,
+            "importing %s took %.3fs (budget: %.3fs)" % (
+                self.module, best, self.budget))
@@ -0,0 +1,97 @@
+"""CLI tools for Python.
+
+Copyright (c) 2009-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+import os
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from cli.app import CommandLineApp
+from cli.cache import ResultCache
+from cli.test import AppMixin
+from cli.util import StringIO
+
+from cli import tests
+
+class CountingApp(CommandLineApp):
+    calls = 0
+
+    def setup(self):
+        CommandLineApp.setup(self)
+        self.add_param("-n", "--number", default=0, type=int)
+        self.add_param("-v", "--verbose", default=False, action="store_true")
+        self.add_param("files", nargs="*", input=True)
+
+    def main(self):
+        CountingApp.calls += 1
+        for name in self.params.files:
+            self.stdout.write(open(name).read())
+        self.stdout.write("%d\n" % self.params.number)
+        return self.params.number
+
+class TestResultCache(AppMixin, tests.BaseTest):
+    app_cls = CountingApp
+
+    def setUp(self):
+        self.tmpdir = mkdtemp(prefix="cli-cache-tests-")
+        self.cache = ResultCache(os.path.join(self.tmpdir, "cache"),
+            exclude=["verbose"])
+        CountingApp.calls = 0
+
+    def tearDown(self):
+        rmtree(self.tmpdir)
+
+    def run_cached(self, cmd):
+        status, app = self.runapp(self.app_cls, cmd, cache=self.cache)
+        return status, app.stdout.getvalue()
+
+    def test_replay(self):
+        self.assertEqual(self.run_cached("test -n 3"), (3, "3\n"))
+        self.assertEqual(self.run_cached("test -n 3 -v"), (3, "3\n"))
+        self.assertEqual(CountingApp.calls, 1)
+        self.assertEqual(self.run_cached("test -n 4"), (4, "4\n"))
+        self.assertEqual(CountingApp.calls, 2)
+
+    def test_inputs(self):
+        name = os.path.join(self.tmpdir, "input")
+        open(name, 'w').write("foo\n")
+        cmd = "test %s" % name
+        self.assertEqual(self.run_cached(cmd), (0, "foo\n0\n"))
+        self.assertEqual(self.run_cached(cmd), (0, "foo\n0\n"))
+        self.assertEqual(CountingApp.calls, 1)
+        open(name, 'w').write("bar\n")
+        self.assertEqual(self.run_cached(cmd), (0, "bar\n0\n"))
+        self.assertEqual(CountingApp.calls, 2)
+
+    def test_evict(self):
+        self.cache.max_size = 10
+        self.run_cached("test -n 1")
+        self.run_cached("test -n 2")
+        self.run_cached("test -n 3")
+        self.assertEqual(len(os.listdir(self.cache.directory)), 2)
+        self.run_cached("test -n 1")
+        self.assertEqual(CountingApp.calls, 4)
+
+    def test_corrupt(self):
+        self.assertEqual(self.run_cached("test -n 3"), (3, "3\n"))
+        paths = [os.path.join(self.cache.directory, name)
+            for name in os.listdir(self.cache.directory)]
+        for data in (b"", b"3", b"x\n3\n"):
+            open(paths[0], 'wb').write(data)
+            self.assertEqual(self.run_cached("test -n 3"), (3, "3\n"))
+        self.assertEqual(CountingApp.calls, 4)
+        self.assertEqual(open(paths[0], 'rb').read(), b"3\n3\n")
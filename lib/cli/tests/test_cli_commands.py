@@ -0,0 +1,82 @@
+"""CLI tools for Python.
+
+Copyright (c) 2009-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+import sys
+
+from cli.app import Application
+from cli.commands import run_commands
+from cli.util import StringIO
+
+from cli import tests
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+class TestRunCommands(tests.BaseTest):
+
+    def run_commands(self, commands, **kwargs):
+        self.stdout = StringIO()
+        self.stderr = StringIO()
+        return run_commands(commands, stdout=self.stdout, stderr=self.stderr,
+            **kwargs)
+
+    def test_statuses(self):
+        results = self.run_commands([
+            python("import sys; sys.exit(3)"),
+            "true",
+            ["cli-tests-no-such-program"],
+        ], jobs=2)
+        self.assertEqual([r.index for r in results], [0, 1, 2])
+        self.assertEqual([r.status for r in results], [3, 0, 127])
+        self.assertTrue(all(r.elapsed >= 0 for r in results))
+        self.assertTrue(self.stderr.getvalue().startswith(
+            "cli-tests-no-such-program: "))
+
+    def test_empty(self):
+        for empty in ("", "  ", []):
+            self.assertRaises(ValueError, self.run_commands, ["true", empty])
+        self.assertEqual(self.stdout.getvalue(), "")
+
+    def test_lines(self):
+        # Each command writes its line in pieces; the pieces must not be
+        # interleaved with the other command's.
+        code = "\n".join([
+            "import sys, time",
+            "for c in %r:",
+            "    sys.stdout.write(c); sys.stdout.flush(); time.sleep(0.01)",
+            "sys.stdout.write('\\n'); sys.stderr.write('err')",
+        ])
+        self.run_commands([python(code % "abcde"), python(code % "vwxyz")],
+            jobs=2)
+        lines = sorted(self.stdout.getvalue().splitlines())
+        self.assertEqual(lines, ["[0] abcde", "[1] vwxyz"])
+        lines = sorted(self.stderr.getvalue().splitlines())
+        self.assertEqual(lines, ["[0] err", "[1] err"])
+
+    def test_prefix(self):
+        self.run_commands(["echo a", "echo b"], jobs=1, prefix="%(name)s: ")
+        self.assertEqual(self.stdout.getvalue(), "echo: a\necho: b\n")
+
+        self.run_commands(["echo a"], prefix=None)
+        self.assertEqual(self.stdout.getvalue(), "a\n")
+
+    def test_application(self):
+        app = Application(main=lambda app: None, exit_after_main=False,
+            stdout=StringIO(), stderr=StringIO())
+        results = app.run_commands(["echo hi"])
+        self.assertEqual(results[0].status, 0)
+        self.assertEqual(app.stdout.getvalue(), "[0] hi\n")
@@ -15,10 +15,18 @@ ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
 OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 """
 import logging
+import os
+import sys
+import threading
+import time
 logging.logMultiprocessing = 0
 
 from cli.ext import argparse
-from cli.log import CommandLineLogger, LoggingApp
+from cli.log import AggregatingHandler, BinaryFileHandler, \
+    BufferedFileHandler, CommandLineLogger, FastFormatter, JsonFormatter, \
+    LoggingApp, Message, QueueHandler, RingHandler, RotatingFileHandler, \
+    decoder, lazy, read_binary_log
+from cli.util import StringIO
 
 from cli import tests
 
@@ -63,6 +71,564 @@ class TestCommandLineLogger(tests.BaseTest):
         self.logger.setLevel(self.fakens)
         self.assertEqual(self.logger.level, logging.CRITICAL)
 
+    def test_disabled_levels(self):
+        handler = ListHandler()
+        self.logger.addHandler(handler)
+        calls = []
+        def expensive():
+            calls.append(1)
+            return "value"
+
+        self.logger.setLevel(logging.INFO)
+        self.assertEqual(self.logger.debug, self.logger.ignore)
+        self.assertFalse(self.logger.isEnabledFor(logging.DEBUG))
+        self.assertTrue(self.logger.isEnabledFor(logging.INFO))
+        self.assertEqual(self.logger.enabled[logging.WARNING], True)
+        self.logger.debug("%s", lazy(expensive))
+        self.logger.debug(Message("{0}", lazy(expensive)))
+        self.assertEqual(calls, [])
+
+        self.logger.info("%s", lazy(expensive))
+        self.logger.info(Message("{0} {x}", 1, x=lazy(expensive)))
+        self.assertEqual(handler.messages, ["value", "1 value"])
+
+        self.logger.level = logging.NOTSET
+        self.assertEqual(self.logger.enabled, {})
+        self.logger.debug("now enabled")
+        self.assertEqual(handler.messages[-1], "now enabled")
+
+    def test_limit(self):
+        handler = ListHandler()
+        self.logger.addHandler(handler)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.logger.limit(rate=3)
+        for i in range(10):
+            self.logger.warning("item %d", i)
+            self.logger.info(Message("{0}", i))
+        self.assertEqual(handler.messages, ["item 0", "0", "item 1", "1",
+            "item 2", "2"])
+        handler.messages = []
+        self.logger.report_suppressed()
+        self.assertEqual(sorted(handler.messages), [
+            "7 records suppressed for message 'item %d'",
+            "7 records suppressed for message '{0}'"])
+        handler.messages = []
+        self.logger.report_suppressed()
+        self.assertEqual(handler.messages, [])
+
+        self.logger.limit(sample=4)
+        for i in range(10):
+            self.logger.debug("item %d", i)
+            self.logger.info("info")
+        self.assertEqual(handler.messages, ["item 0"] + ["info"] * 4 +
+            ["item 4"] + ["info"] * 4 + ["item 8"] + ["info"] * 2)
+
+        # Messages built on the fly don't pile up.
+        self.logger.limit(rate=3)
+        self.logger.max_sites = 10
+        for i in range(100):
+            self.logger.warning("item %d" % i)
+        self.assertTrue(len(self.logger.sites) <= 10)
+        self.logger.report_suppressed()
+        self.assertEqual(self.logger.sites, {})
+
+        self.logger.limit()
+        self.assertFalse("_log" in self.logger.__dict__)
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+        self.release_event = None
+        self.emitting = threading.Event()
+
+    def emit(self, record):
+        self.emitting.set()
+        if self.release_event is not None:
+            self.release_event.wait()
+        self.messages.append(record.getMessage())
+
+class TestQueueHandler(tests.BaseTest):
+
+    def record(self, msg, level=logging.INFO):
+        return logging.makeLogRecord({"msg": msg, "levelno": level,
+            "levelname": logging.getLevelName(level)})
+
+    def test_flush(self):
+        target = ListHandler()
+        handler = QueueHandler(target, batch=3)
+        for i in range(10):
+            handler.handle(self.record("%d" % i))
+        handler.flush()
+        self.assertEqual(target.messages, ["%d" % i for i in range(10)])
+        handler.close()
+        handler.handle(self.record("closed"))
+        self.assertEqual(target.messages[-1], "closed")
+
+    def test_overflow(self):
+        for overflow, expected in (
+                ("drop", ["0", "1", "2"]),
+                ("drop-oldest", ["0", "3", "4"])):
+            target = ListHandler()
+            target.release_event = threading.Event()
+            handler = QueueHandler(target, capacity=2, overflow=overflow,
+                batch=1)
+            handler.handle(self.record("0"))
+            # Wait for the worker to pick up the first record.
+            target.emitting.wait(5)
+            if not target.emitting.is_set():
+                target.release_event.set()
+                self.fail("the worker didn't start writing")
+            for i in range(1, 5):
+                handler.handle(self.record("%d" % i))
+            self.assertEqual(handler.dropped, 2)
+            target.release_event.set()
+            handler.close()
+            self.assertEqual(target.messages,
+                expected + ["2 log messages dropped"])
+
+    def test_stream(self):
+        stream = StringIO()
+        target = logging.StreamHandler(stream)
+        target.setLevel(logging.INFO)
+        handler = QueueHandler(target)
+        handler.handle(self.record("debug", logging.DEBUG))
+        handler.handle(self.record("a"))
+        handler.handle(self.record("b"))
+        handler.flush()
+        self.assertEqual(stream.getvalue(), "a\nb\n")
+        handler.close()
+
+    def test_stream_subclass(self):
+        class Upper(logging.StreamHandler):
+            def emit(self, record):
+                self.stream.write(record.getMessage().upper() + "\n")
+
+        stream = StringIO()
+        handler = QueueHandler(Upper(stream))
+        handler.handle(self.record("a"))
+        handler.flush()
+        self.assertEqual(stream.getvalue(), "A\n")
+        handler.close()
+
+    def test_bad_policy(self):
+        self.assertRaises(ValueError, QueueHandler, None, overflow="wait")
+
+class TestAggregatingHandler(tests.BaseTest):
+
+    def record(self, msg, *args):
+        return logging.makeLogRecord({"msg": msg, "args": args,
+            "levelno": logging.INFO, "levelname": "INFO"})
+
+    def test_children(self):
+        stream = StringIO()
+        handler = AggregatingHandler(logging.StreamHandler(stream))
+        pids = []
+        for child in range(3):
+            pid = os.fork()
+            if not pid:
+                for i in range(50):
+                    handler.handle(self.record("%d %d", child, i))
+                os._exit(0)
+            pids.append(pid)
+        handler.handle(self.record("parent"))
+        for pid in pids:
+            os.waitpid(pid, 0)
+        handler.flush()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 151)
+        self.assertTrue("parent" in lines)
+        for child in range(3):
+            self.assertEqual([line for line in lines
+                if line.startswith("%d " % child)],
+                ["%d %d" % (child, i) for i in range(50)])
+        handler.close()
+
+    def test_orphan(self):
+        # A child whose parent has exited doesn't block on a full socket.
+        import select
+        r, w = os.pipe()
+        pid = os.fork()
+        if not pid:
+            os.close(r)
+            handler = AggregatingHandler(ListHandler())
+            errors = []
+            handler.handleError = errors.append
+            parent = os.getpid()
+            if not os.fork():
+                # Don't outlive the test if sending does block.
+                import signal
+                signal.alarm(20)
+                while os.getppid() == parent:
+                    time.sleep(0.01)
+                for i in range(1000):
+                    handler.handle(self.record("%d", i))
+                os.write(w, ("%d" % len(errors)).encode("ascii"))
+            os._exit(0)
+        os.close(w)
+        os.waitpid(pid, 0)
+        try:
+            readable, _, _ = select.select([r], [], [], 10)
+            self.assertTrue(readable)
+            self.assertEqual(os.read(r, 100), b"1000")
+        finally:
+            os.close(r)
+
+    def test_exception(self):
+        target = ListHandler()
+        handler = AggregatingHandler(target)
+        try:
+            raise ValueError("oops")
+        except ValueError:
+            record = self.record("failed")
+            record.exc_info = sys.exc_info()
+        record = handler.load(handler.dump(record))
+        self.assertEqual(record.exc_info, None)
+        self.assertTrue(record.exc_text.endswith("ValueError: oops"))
+        handler.close()
+
+    def test_adopt(self):
+        target = ListHandler()
+        handler = AggregatingHandler(target)
+        handler.adopt()
+        handler.handle(self.record("adopted"))
+        handler.close()
+        self.assertEqual(target.messages, ["adopted"])
+
+class TestRingHandler(tests.BaseTest):
+
+    def record(self, msg, level=logging.DEBUG):
+        return logging.makeLogRecord({"msg": msg, "levelno": level,
+            "levelname": logging.getLevelName(level)})
+
+    def test_dump_on_error(self):
+        target = ListHandler()
+        handler = RingHandler(target, capacity=3)
+        for i in range(5):
+            handler.handle(self.record("%d" % i))
+        handler.handle(self.record("warning", logging.WARNING))
+        self.assertEqual(target.messages, ["warning"])
+        handler.handle(self.record("error", logging.ERROR))
+        self.assertEqual(target.messages, ["warning", "2", "3", "4", "error"])
+        handler.dump()
+        self.assertEqual(len(target.messages), 5)
+        handler.close()
+
+    def test_adopt(self):
+        target = ListHandler()
+        inner = AggregatingHandler(target)
+        handler = RingHandler(inner)
+        reader = inner.reader
+        handler.adopt()
+        self.assertFalse(inner.reader is reader)
+        handler.handle(self.record("debug"))
+        handler.handle(self.record("error", logging.ERROR))
+        handler.close()
+        self.assertEqual(target.messages, ["debug", "error"])
+        RingHandler(ListHandler()).adopt()
+
+    def test_signal(self):
+        import signal
+        target = ListHandler()
+        handler = RingHandler(target)
+        handler.start()
+        handler.handle(self.record("debug"))
+        os.kill(os.getpid(), signal.SIGUSR2)
+        self.assertEqual(target.messages, ["debug"])
+        handler.close()
+        self.assertEqual(signal.getsignal(signal.SIGUSR2), signal.SIG_DFL)
+
+class TestBufferedFileHandler(tests.BaseTest):
+
+    def setUp(self):
+        import tempfile
+        fd, self.path = tempfile.mkstemp(prefix="cli-log-tests-")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def contents(self):
+        return open(self.path).read()
+
+    def test_flush_policy(self):
+        handler = BufferedFileHandler(self.path, bufsize=20, interval=60)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log = logging.Logger("buffered")
+        log.addHandler(handler)
+
+        log.info("one")
+        self.assertEqual(self.contents(), "")
+        log.warning("two")
+        self.assertEqual(self.contents(), "one\ntwo\n")
+        log.info("three")
+        log.info("a longer message")
+        self.assertEqual(self.contents(), "one\ntwo\nthree\na longer message\n")
+        log.info("four")
+        handler.close()
+        self.assertEqual(self.contents().split()[-1], "four")
+
+    def test_interval(self):
+        import time
+        handler = BufferedFileHandler(self.path, interval=0.01)
+        handler.handle(logging.makeLogRecord({"msg": "one",
+            "levelno": logging.INFO}))
+        for i in range(100):
+            if self.contents():
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.contents(), "one\n")
+        handler.close()
+
+class TestFastFormatter(tests.BaseTest):
+    formats = [
+        (None, None),
+        ("%(asctime)s %(message)s", "%Y-%m-%dT%H:%M:%S"),
+        ("%(asctime)s %(levelname)-8s %(name)s:%(lineno)4d %(message)s", None),
+        ("100%% %(message)r", None),
+        ("no fields", None),
+    ]
+
+    def record(self, created, **kwargs):
+        record = logging.LogRecord("test", logging.INFO, __file__, 42,
+            "%s and %d", ("text", 3), None)
+        record.created = created
+        record.msecs = (created - int(created)) * 1000
+        record.__dict__.update(kwargs)
+        return record
+
+    def test_same_output(self):
+        for fmt, datefmt in self.formats:
+            fast = FastFormatter(fmt, datefmt)
+            slow = logging.Formatter(fmt, datefmt)
+            for created in (1000000000.25, 1000000000.5, 1000000001.0):
+                self.assertEqual(fast.format(self.record(created)),
+                    slow.format(self.record(created)))
+
+    def test_exception(self):
+        try:
+            raise ValueError("oops")
+        except ValueError:
+            exc_info = sys.exc_info()
+        fast = FastFormatter("%(message)s")
+        slow = logging.Formatter("%(message)s")
+        self.assertEqual(fast.format(self.record(0, exc_info=exc_info)),
+            slow.format(self.record(0, exc_info=exc_info)))
+
+    def test_missing_field(self):
+        fast = FastFormatter("%(nosuchfield)s")
+        self.assertRaises(KeyError, fast.format, self.record(0))
+
+class TestRotatingFileHandler(tests.BaseTest):
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.mkdtemp(prefix="cli-log-tests-")
+        self.path = os.path.join(self.tmpdir, "app.log")
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
+    def record(self, msg):
+        return logging.makeLogRecord({"msg": msg, "levelno": logging.INFO})
+
+    def test_max_bytes(self):
+        import gzip
+        handler = RotatingFileHandler(self.path, max_bytes=10, backups=2)
+        for i in range(4):
+            handler.handle(self.record("message %d" % i))
+        handler.handle(self.record("last"))
+        handler.close()
+
+        self.assertEqual(open(self.path).read(), "last\n")
+        old = handler.rotated()
+        self.assertEqual(len(old), 2)
+        contents = []
+        for path in old:
+            self.assertTrue(path.endswith(".gz"))
+            contents.append(gzip.open(path).read())
+        self.assertEqual(contents, [b"message 2\n", b"message 3\n"])
+
+    def test_rotate(self):
+        handler = RotatingFileHandler(self.path, rotate="hourly",
+            compress=False)
+        now = time.time()
+        self.assertTrue(now < handler.rollover_at <= now + 3600)
+        handler.rollover_at = now
+        handler.handle(self.record("first"))
+        handler.handle(self.record("second"))
+        handler.close()
+        self.assertEqual(open(self.path).read(), "second\n")
+        old = handler.rotated()
+        self.assertEqual([open(path).read() for path in old], ["first\n"])
+
+    def test_cleanup_race(self):
+        # Workers pruning everything must not trip over each other.
+        handler = RotatingFileHandler(self.path, max_bytes=1, backups=0)
+        for i in range(10):
+            handler.handle(self.record("message %d" % i))
+        handler.close()
+        self.assertEqual(handler.rotated(), [])
+        self.assertEqual(os.listdir(self.tmpdir), ["app.log"])
+
+        # A file that has gone already is skipped.
+        handler.cleanup(self.path + ".gone")
+
+    def test_next_rollover(self):
+        handler = RotatingFileHandler(self.path, rotate="daily")
+        midnight = time.mktime((2010, 1, 2, 0, 0, 0, 0, 0, -1))
+        self.assertEqual(handler.next_rollover(midnight - 1), midnight)
+        self.assertEqual(handler.next_rollover(midnight), midnight + 86400)
+        handler.close()
+
+class TestBinaryFileHandler(tests.BaseTest):
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.mkdtemp(prefix="cli-log-tests-")
+        self.path = os.path.join(self.tmpdir, "app.log")
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
+    def record(self, msg, *args, **kwargs):
+        return logging.makeLogRecord(dict({"name": "test", "msg": msg,
+            "args": args, "levelno": logging.INFO, "levelname": "INFO",
+            "created": 1000000000.25}, **kwargs))
+
+    def read(self):
+        f = open(self.path, 'rb')
+        try:
+            return list(read_binary_log(f))
+        finally:
+            f.close()
+
+    def test_round_trip(self):
+        try:
+            raise ValueError("oops")
+        except ValueError:
+            exc_info = sys.exc_info()
+        records = [
+            self.record("%s %s %s %s %s", 1, -2 ** 40, 2.5, None, True),
+            self.record("%s and %s", u"caf\xe9", object),
+            self.record("%d items", 3, levelno=logging.ERROR,
+                levelname="ERROR", exc_info=exc_info),
+            self.record(Message("{0}", 1)),
+            self.record("%d items", 4),
+            self.record("%(a)s"),
+            self.record("%d", 2 ** 70),
+        ]
+        records[-2].args = {"a": "b"}
+        handler = BinaryFileHandler(self.path)
+        for record in records:
+            handler.handle(record)
+        handler.close()
+        # Templates are written once per file.
+        self.assertEqual(len(handler.templates), 6)
+
+        decoded = self.read()
+        self.assertEqual([r.getMessage() for r in decoded],
+            [r.getMessage() for r in records])
+        self.assertEqual([(r.name, r.levelname, r.created) for r in decoded],
+            [(r.name, r.levelname, r.created) for r in records])
+        self.assertEqual(decoded[0].args, (1, -2 ** 40, 2.5, None, True))
+        self.assertEqual(decoded[2].exc_text, records[2].exc_text)
+
+        # A new handler adds to the file with its own templates.
+        handler = BinaryFileHandler(self.path)
+        handler.handle(self.record("again"))
+        handler.close()
+        self.assertEqual([r.getMessage() for r in self.read()[-2:]],
+            [str(2 ** 70), "again"])
+
+    def test_partial(self):
+        handler = BinaryFileHandler(self.path)
+        handler.handle(self.record("complete"))
+        handler.handle(self.record("partial %s", "x" * 10))
+        handler.close()
+        f = open(self.path, 'r+b')
+        f.truncate(os.path.getsize(self.path) - 5)
+        f.close()
+        self.assertEqual([r.getMessage() for r in self.read()], ["complete"])
+
+    def test_decoder(self):
+        handler = BinaryFileHandler(self.path)
+        handler.handle(self.record("%d items", 3))
+        handler.close()
+        stdout = StringIO()
+        app = decoder(argv=["cli-decode-log", "-f", "%(levelname)s %(message)s",
+            self.path], stdout=stdout, exit_after_main=False)
+        app.run()
+        self.assertEqual(stdout.getvalue(), "INFO 3 items\n")
+
+        open(self.path, 'w').close()
+        self.assertRaises(ValueError, self.read)
+
+    def test_decoder_encoding(self):
+        import io
+        class ByteStream(io.BytesIO):
+            # Like a pipe: bytes, and text only if it's ASCII.
+            encoding = None
+            def write(self, s):
+                if not isinstance(s, bytes):
+                    s = s.encode("ascii")
+                return io.BytesIO.write(self, s)
+
+        handler = BinaryFileHandler(self.path)
+        handler.handle(self.record("%s", u"caf\xe9"))
+        handler.close()
+        stdout = ByteStream()
+        app = decoder(argv=["cli-decode-log", "-f", "%(message)s", self.path],
+            stdout=stdout, exit_after_main=False)
+        self.assertEqual(app.run(), 0)
+        self.assertEqual(stdout.getvalue(), u"caf\xe9\n".encode("utf-8"))
+
+class TestJsonFormatter(tests.BaseTest):
+
+    def test_format(self):
+        import json
+        record = logging.makeLogRecord({"name": "test", "msg": "%s \"quoted\"",
+            "args": (u"caf\xe9",), "levelno": logging.INFO,
+            "levelname": "INFO", "created": 1000000000.25, "msecs": 250.0,
+            "user": "will", "count": 3, "tags": ["a", "b"], "obj": object})
+        line = JsonFormatter().format(record)
+        self.assertFalse("\n" in line)
+        data = json.loads(line)
+        self.assertEqual(data.pop("time"), time.strftime("%Y-%m-%dT%H:%M:%S",
+            time.localtime(1000000000)) + ".250")
+        self.assertEqual(data.pop("obj"), repr(object))
+        self.assertEqual(data, {"level": "INFO", "name": "test",
+            "message": u"caf\xe9 \"quoted\"", "user": "will", "count": 3,
+            "tags": ["a", "b"]})
+
+    def test_collisions(self):
+        import json
+        record = logging.makeLogRecord({"name": "test", "msg": "hello",
+            "levelno": logging.INFO, "levelname": "INFO",
+            "created": 1000000000.25, "msecs": 250.0, "time": 5, "level": 1})
+        line = JsonFormatter(datefmt=None).format(record)
+        self.assertEqual(line.count('"time"'), 1)
+        data = json.loads(line)
+        self.assertEqual(data["time"], time.strftime("%Y-%m-%d %H:%M:%S",
+            time.localtime(1000000000)) + ".250")
+        self.assertEqual((data["level"], data["extra_time"],
+            data["extra_level"]), ("INFO", 5, 1))
+
+    def test_exception(self):
+        import json
+        try:
+            raise ValueError("oops")
+        except ValueError:
+            exc_info = sys.exc_info()
+        record = logging.makeLogRecord({"name": "test", "msg": "failed",
+            "exc_info": exc_info})
+        data = json.loads(JsonFormatter().format(record))
+        self.assertTrue(data["exc_info"].endswith("ValueError: oops"))
+
 class TestLoggingApp(tests.AppTest):
     app_cls = FakeLoggingApp
 
@@ -74,6 +640,166 @@ class TestLoggingApp(tests.AppTest):
         _, app = self.runapp(self.app_cls, "test -vvv -qqq")
         self.assertEqual(app.log.level, logging.WARNING)
 
+    def test_own_handlers(self):
+        closed = []
+        class Handler(logging.Handler):
+            def emit(self, record):
+                pass
+            def close(self):
+                closed.append(self)
+                logging.Handler.close(self)
+        user = Handler()
+
+        class Test(LoggingApp):
+            def main(self):
+                self.log.propagate = False
+                if user not in self.log.handlers:
+                    self.log.addHandler(user)
+
+        app = Test(argv=["test"], exit_after_main=False, stream=StringIO())
+        self.assertEqual(app.run_many([[], []]), [0, 0])
+        self.assertTrue(user in app.log.handlers)
+        self.assertEqual(len(app.log.handlers), 2)
+        self.assertEqual(app.log_handlers, [app.log.handlers[1]])
+        self.assertEqual(closed, [])
+
+    def test_log_queue(self):
+        class Test(LoggingApp):
+            def main(self):
+                self.log.propagate = False
+                for i in range(100):
+                    self.log.warning("%d", i)
+
+        stream = StringIO()
+        status, app = self.runapp(Test, "test", stream=stream, log_queue=True,
+            message_format="%(message)s")
+        self.assertTrue(isinstance(app.log.handlers[0], QueueHandler))
+        self.assertEqual(stream.getvalue().split(),
+            ["%d" % i for i in range(100)])
+        app.log.handlers[0].close()
+
+    def test_log_queue_rotate(self):
+        import shutil
+        import tempfile
+        class Test(LoggingApp):
+            def main(self):
+                self.log.propagate = False
+                for i in range(200):
+                    self.log.warning("message %d", i)
+
+        tmpdir = tempfile.mkdtemp(prefix="cli-log-tests-")
+        try:
+            path = os.path.join(tmpdir, "r.log")
+            _, app = self.runapp(Test, "test -l %s --log-max-bytes 1000" % path,
+                log_queue=True)
+            queue = app.log.handlers[0]
+            queue.close()
+            handler = queue.handler
+            handler.close()
+            self.assertTrue(isinstance(handler, RotatingFileHandler))
+            self.assertTrue(len(handler.rotated()) > 1)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_log_format(self):
+        import json
+        class Test(LoggingApp):
+            def main(self):
+                self.log.propagate = False
+                self.log.warning("hello %s", "world", extra={"id": 1})
+
+        stream = StringIO()
+        status, app = self.runapp(Test, "test --log-format json", stream=stream)
+        data = json.loads(stream.getvalue())
+        self.assertEqual((data["message"], data["id"]), ("hello world", 1))
+
+    def test_log_aggregate(self):
+        class Test(LoggingApp):
+            def main(self):
+                self.log.propagate = False
+                pid = os.fork()
+                if not pid:
+                    self.log.warning("child")
+                    os._exit(0)
+                os.waitpid(pid, 0)
+
+        stream = StringIO()
+        status, app = self.runapp(Test, "test", stream=stream,
+            log_aggregate=True, message_format="%(message)s")
+        self.assertTrue(isinstance(app.log.handlers[0], AggregatingHandler))
+        self.assertEqual(stream.getvalue(), "child\n")
+        app.log.handlers[0].close()
+
+    def test_log_ring(self):
+        class Test(LoggingApp):
+            def main(self):
+                self.log.propagate = False
+                self.log.debug("context")
+                self.log.warning("warning")
+                raise ValueError("oops")
+
+        stream = StringIO()
+        status, app = self.runapp(Test, "test", stream=stream, log_ring=10,
+            message_format="%(message)s", reraise=())
+        self.assertEqual(stream.getvalue(), "warning\ncontext\n")
+        self.assertEqual(app.log.handlers[0].threshold, logging.WARNING)
+        app.log.handlers[0].close()
+
+        # The exception propagates, but the context is written first.
+        stream = StringIO()
+        app = Test(argv=["test"], exit_after_main=False, stream=stream,
+            log_ring=10, message_format="%(message)s")
+        self.assertRaises(ValueError, app.run)
+        self.assertEqual(stream.getvalue(), "warning\ncontext\n")
+        app.log.handlers[0].close()
+
+    def test_log_format_binary(self):
+        import tempfile
+        fd, path = tempfile.mkstemp(prefix="cli-log-tests-")
+        os.close(fd)
+        try:
+            class Test(LoggingApp):
+                def main(self):
+                    self.log.propagate = False
+                    self.log.warning("%d items", 3)
+
+            for kwargs in ({}, {"log_queue": True}):
+                open(path, 'w').close()
+                _, app = self.runapp(Test,
+                    "test --log-format binary -l %s" % path, **kwargs)
+                handler = app.log.handlers[0]
+                handler.close()
+                getattr(handler, "handler", handler).close()
+                f = open(path, 'rb')
+                try:
+                    self.assertEqual(
+                        [r.getMessage() for r in read_binary_log(f)],
+                        ["3 items"])
+                finally:
+                    f.close()
+        finally:
+            os.remove(path)
+
+        stderr = StringIO()
+        self.assertRaises(SystemExit, self.runapp, self.app_cls,
+            "test --log-format binary", stderr=stderr)
+        self.assertTrue("--logfile" in stderr.getvalue())
+
+    def test_rotate_params(self):
+        import tempfile
+        fd, path = tempfile.mkstemp(prefix="cli-log-tests-")
+        os.close(fd)
+        try:
+            _, app = self.runapp(self.app_cls,
+                "test -l %s --log-max-bytes 100 --log-rotate daily" % path)
+            handler = app.log.handlers[0]
+            self.assertTrue(isinstance(handler, RotatingFileHandler))
+            self.assertEqual((handler.max_bytes, handler.rotate),
+                (100, "daily"))
+            handler.close()
+        finally:
+            os.remove(path)
+
     def test_no_stream_or_logfile(self):
         self.app.logfile = None
         self.app.stream = None
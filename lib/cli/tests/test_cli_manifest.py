@@ -0,0 +1,118 @@
+"""CLI tools for Python.
+
+Copyright (c) 2009-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+import os
+import time
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from cli.app import CommandLineApp
+from cli.manifest import Manifest
+from cli.test import AppMixin
+
+from cli import tests
+
+class ConcatApp(CommandLineApp):
+    processed = []
+
+    def setup(self):
+        CommandLineApp.setup(self)
+        self.add_param("-o", "--output", output=True)
+        self.add_param("-f", "--fail", default=None)
+        self.add_param("files", nargs="*", input=True)
+
+    def main(self):
+        out = open(self.params.output, 'a')
+        for name in self.manifest.stale(self.params.files):
+            if name == self.params.fail:
+                return 1
+            out.write(open(name).read())
+            self.processed.append(os.path.basename(name))
+            self.manifest.done(name)
+        out.close()
+
+class TouchApp(CommandLineApp):
+    runs = 0
+
+    def setup(self):
+        CommandLineApp.setup(self)
+        self.add_param("-o", "--output", output=True)
+        self.add_param("files", nargs="*", input=True)
+
+    def main(self):
+        TouchApp.runs += 1
+        open(self.params.output, 'w').close()
+
+class TestManifest(AppMixin, tests.BaseTest):
+
+    def setUp(self):
+        self.tmpdir = mkdtemp(prefix="cli-manifest-tests-")
+        self.inputs = []
+        for name in "abc":
+            path = os.path.join(self.tmpdir, name)
+            open(path, 'w').write(name)
+            self.inputs.append(path)
+        self.output = os.path.join(self.tmpdir, "out")
+        ConcatApp.processed = []
+
+    def tearDown(self):
+        rmtree(self.tmpdir)
+
+    def run_incremental(self, *args):
+        manifest = Manifest(os.path.join(self.tmpdir, "manifest"))
+        cmd = "test -o %s %s %s" % (self.output, " ".join(args),
+            " ".join(self.inputs))
+        status, app = self.runapp(ConcatApp, cmd, manifest=manifest)
+        return status
+
+    def test_skip(self):
+        self.assertEqual(self.run_incremental(), 0)
+        self.assertEqual(ConcatApp.processed, ["a", "b", "c"])
+        self.assertEqual(self.run_incremental(), 0)
+        self.assertEqual(ConcatApp.processed, ["a", "b", "c"])
+
+        # Changing an input redoes only that item.
+        open(self.inputs[1], 'w').write("B")
+        future = time.time() + 10
+        os.utime(self.inputs[1], (future, future))
+        self.assertEqual(self.run_incremental(), 0)
+        self.assertEqual(ConcatApp.processed, ["a", "b", "c", "b"])
+        self.assertEqual(open(self.output).read(), "abcB")
+
+    def test_partial_failure(self):
+        self.assertEqual(self.run_incremental("-f", self.inputs[2]), 1)
+        self.assertEqual(ConcatApp.processed, ["a", "b"])
+        self.assertEqual(self.run_incremental("-f", self.inputs[2]), 1)
+        self.assertEqual(ConcatApp.processed, ["a", "b"])
+
+    def test_missing_output(self):
+        self.assertEqual(self.run_incremental(), 0)
+        os.remove(self.output)
+        self.assertEqual(self.run_incremental(), 0)
+        self.assertEqual(ConcatApp.processed, ["a", "b", "c"] * 2)
+        self.assertEqual(open(self.output).read(), "abc")
+
+    def test_missing_input(self):
+        manifest = Manifest(os.path.join(self.tmpdir, "manifest"))
+        missing = os.path.join(self.tmpdir, "missing")
+        cmd = "test -o %s %s" % (self.output, missing)
+        TouchApp.runs = 0
+        for i in range(2):
+            status, app = self.runapp(TouchApp, cmd, manifest=manifest)
+            self.assertEqual(status, 0)
+        self.assertEqual(TouchApp.runs, 2)
@@ -0,0 +1,101 @@
+"""CLI tools for Python.
+
+Copyright (c) 2009-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+import errno
+
+from cli.app import Application, BrokenPipe
+from cli.output import OutputWriter
+from cli.util import StringIO
+
+from cli import tests
+
+class CountingStream(StringIO):
+    writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        StringIO.write(self, s)
+
+class ClosedStream(StringIO):
+
+    def write(self, s):
+        raise IOError(errno.EPIPE, "Broken pipe")
+
+class TestOutputWriter(tests.BaseTest):
+
+    def setUp(self):
+        self.stream = CountingStream()
+
+    def test_default_policy(self):
+        writer = OutputWriter(self.stream)
+        self.assertEqual(writer.policy, "block")
+
+    def test_block(self):
+        writer = OutputWriter(self.stream, bufsize=10, policy="block")
+        for i in range(4):
+            writer.write("ab\n")
+        self.assertEqual(self.stream.writes, 1)
+        self.assertEqual(self.stream.getvalue(), "ab\n" * 4)
+        writer.write("cd\n")
+        writer.flush()
+        self.assertEqual(self.stream.writes, 2)
+        self.assertEqual(self.stream.getvalue(), "ab\n" * 4 + "cd\n")
+
+    def test_line(self):
+        writer = OutputWriter(self.stream, policy="line")
+        writer.write("ab")
+        self.assertEqual(self.stream.writes, 0)
+        writer.write("c\n")
+        self.assertEqual(self.stream.getvalue(), "abc\n")
+
+    def test_bad_policy(self):
+        self.assertRaises(ValueError, OutputWriter, self.stream, policy="foo")
+
+    def test_broken(self):
+        writer = OutputWriter(ClosedStream())
+        writer.write("foo")
+        self.assertRaises(IOError, writer.flush)
+        self.assertTrue(writer.broken)
+        writer.write("bar")
+        writer.flush()
+
+class TestBrokenPipe(tests.BaseTest):
+
+    def test_buffered_app(self):
+        @Application(exit_after_main=False, stdout=ClosedStream(),
+            buffer_output=True)
+        def app(app):
+            app.stdout.write("foo\n")
+
+        self.assertEqual(app.run(), BrokenPipe().status)
+
+    def test_unbuffered_app(self):
+        @Application(exit_after_main=False, stdout=ClosedStream())
+        def app(app):
+            app.stdout.write("foo\n")
+
+        self.assertEqual(app.run(), BrokenPipe().status)
+
+    def test_error(self):
+        @Application(exit_after_main=False, stdout=ClosedStream(),
+            buffer_output=True)
+        def app(app):
+            app.stdout.write("foo\n")
+            raise ValueError("oops")
+
+        # The closed pipe doesn't hide the error.
+        self.assertRaises(ValueError, app.run)
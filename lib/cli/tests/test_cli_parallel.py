@@ -0,0 +1,100 @@
+"""CLI tools for Python.
+
+Copyright (c) 2009-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+import os
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from cli.parallel import ParallelFilesApp
+from cli.test import AppMixin
+
+from cli import tests
+
+class FakeParallelFilesApp(ParallelFilesApp):
+
+    def setup(self):
+        ParallelFilesApp.setup(self)
+        self.add_param("files", nargs="*")
+
+    def process_file(self, path, stdout):
+        data = open(path).read()
+        if data == "fail":
+            raise RuntimeError("Just testing.")
+        stdout.write("%s %d\n" % (os.path.basename(path), os.getpid()))
+        self.aggregator.add("files")
+        self.aggregator.add("bytes", len(data))
+        self.aggregator.observe("sizes", len(data))
+        self.aggregator.add_array("chars", [data.count("x"), 1])
+        return int(data == "xxxx")
+
+    def declare_aggregates(self, aggregator):
+        aggregator.counter("files")
+        aggregator.sum("bytes")
+        aggregator.histogram("sizes", [1000, 5000])
+        aggregator.array("chars", 'l', 2)
+
+class TestParallelFilesApp(AppMixin, tests.BaseTest):
+
+    def setUp(self):
+        self.tmpdir = mkdtemp(prefix="cli-parallel-tests-")
+        self.files = []
+        for i in range(8):
+            path = os.path.join(self.tmpdir, str(i))
+            open(path, 'w').write("x" * (i * 1000 + 3))
+            self.files.append(path)
+
+    def tearDown(self):
+        rmtree(self.tmpdir)
+
+    def run_files(self, jobs):
+        cmd = "test -j %d %s" % (jobs, " ".join(self.files))
+        status, app = self.runapp(FakeParallelFilesApp, cmd)
+        lines = app.stdout.getvalue().splitlines()
+        self.aggregates = app.aggregates
+        return status, [line.split() for line in lines]
+
+    def test_serial(self):
+        status, lines = self.run_files(1)
+        self.assertEqual(status, 0)
+        self.assertEqual([name for name, pid in lines],
+            [str(i) for i in range(8)])
+        self.assertEqual(set(pid for name, pid in lines), set([str(os.getpid())]))
+
+    def test_parallel(self):
+        open(self.files[2], 'w').write("xxxx")
+        status, lines = self.run_files(3)
+        self.assertEqual(status, 1)
+        self.assertEqual([name for name, pid in lines],
+            [str(i) for i in range(8)])
+        self.assertFalse(str(os.getpid()) in [pid for name, pid in lines])
+
+    def test_exception(self):
+        open(self.files[1], 'w').write("fail")
+        status, lines = self.run_files(2)
+        self.assertEqual(status, 1)
+        self.assertTrue(["RuntimeError:", "Just", "testing."] in lines)
+
+    def test_aggregates(self):
+        for jobs in (1, 3):
+            self.run_files(jobs)
+            self.assertEqual(self.aggregates, {
+                "files": 8,
+                "bytes": 28024.0,
+                "sizes": [1, 4, 3],
+                "chars": [28024, 8],
+            })
@@ -0,0 +1,75 @@
+"""CLI tools for Python.
+
+Copyright (c) 2009-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+import os
+import signal
+import time
+
+from cli.app import Application
+from cli.progress import Progress
+from cli.util import StringIO
+
+from cli import tests
+
+class TestProgress(tests.BaseTest):
+
+    def setUp(self):
+        self.stream = StringIO()
+
+    def test_count(self):
+        progress = Progress(stream=self.stream, total=10)
+        progress.start()
+        progress()
+        progress(3)
+        progress.stop()
+        self.assertEqual(progress.count, 4)
+        self.assertTrue(progress.report().startswith("4/10 (40.0%) items, "))
+        self.assertTrue("ETA" in progress.report())
+
+        progress.start()
+        progress(2)
+        progress.stop()
+        self.assertEqual(progress.count, 2)
+
+    def test_signal(self):
+        progress = Progress(stream=self.stream, signals=[signal.SIGUSR1])
+        @Application(exit_after_main=False, progress=progress)
+        def app(app):
+            app.progress(5)
+            os.kill(os.getpid(), signal.SIGUSR1)
+
+        app.run()
+        self.assertTrue(self.stream.getvalue().startswith("5 items, "))
+        self.assertEqual(signal.getsignal(signal.SIGUSR1), signal.SIG_DFL)
+
+    def test_interactive(self):
+        progress = Progress(stream=self.stream, interactive=True,
+            interval=0.01, signals=())
+        progress.start()
+        progress(2)
+        time.sleep(0.1)
+        progress.stop()
+        self.assertTrue("\r\033[K2 items, " in self.stream.getvalue())
+
+    def test_default(self):
+        @Application(exit_after_main=False, stderr=self.stream)
+        def app(app):
+            app.progress()
+
+        app.run()
+        self.assertEqual(app.progress.count, 1)
+        self.assertEqual(self.stream.getvalue(), "")
@@ -0,0 +1,149 @@
+"""CLI tools for Python.
+
+Copyright (c) 2009-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+import os
+import threading
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from cli.app import CommandLineApp
+from cli.test import AppMixin
+from cli.util import StringIO
+from cli.watch import InotifyWatcher, Watcher
+
+from cli import tests
+
+class TestWatcher(tests.BaseTest):
+    watcher_cls = Watcher
+
+    def setUp(self):
+        self.tmpdir = mkdtemp(prefix="cli-watch-tests-")
+        self.file = os.path.join(self.tmpdir, "file")
+        self.dir = os.path.join(self.tmpdir, "dir")
+        open(self.file, 'w').write("a")
+        os.mkdir(self.dir)
+
+    def tearDown(self):
+        rmtree(self.tmpdir)
+
+    def watcher(self):
+        try:
+            return self.watcher_cls([self.file, self.dir], interval=0.01,
+                debounce=0.05)
+        except OSError:
+            return None
+
+    def test_nothing_changed(self):
+        watcher = self.watcher()
+        if watcher is None:
+            return
+        open(os.path.join(self.tmpdir, "other"), 'w').write("x")
+        self.assertEqual(watcher.wait(0.1), [])
+        watcher.close()
+
+    def test_changes(self):
+        watcher = self.watcher()
+        if watcher is None:
+            return
+        open(self.file, 'a').write("bb")
+        open(os.path.join(self.dir, "new"), 'w').write("x")
+        self.assertEqual(watcher.wait(1), sorted([self.file, self.dir]))
+        self.assertEqual(watcher.wait(0.1), [])
+
+        os.remove(self.file)
+        self.assertEqual(watcher.wait(1), [self.file])
+        watcher.close()
+
+    def test_ignore(self):
+        output = os.path.join(self.dir, "output")
+        try:
+            watcher = self.watcher_cls([self.dir], interval=0.01,
+                debounce=0.05, ignore=[output])
+        except OSError:
+            return
+        open(output, 'w').write("x")
+        self.assertEqual(watcher.wait(0.1), [])
+        open(os.path.join(self.dir, "new"), 'w').write("x")
+        self.assertEqual(watcher.wait(1), [self.dir])
+        watcher.close()
+
+class TestInotifyWatcher(TestWatcher):
+    watcher_cls = InotifyWatcher
+
+class TestWatchMode(AppMixin, tests.BaseTest):
+
+    def setUp(self):
+        self.tmpdir = mkdtemp(prefix="cli-watch-tests-")
+        self.input = os.path.join(self.tmpdir, "input")
+        open(self.input, 'w').write("a")
+
+    def tearDown(self):
+        rmtree(self.tmpdir)
+
+    def test_watch(self):
+        path = self.input
+        class Test(CommandLineApp):
+            runs = []
+
+            def setup(self):
+                CommandLineApp.setup(self)
+                self.add_param("input", input=True)
+
+            def main(self):
+                data = open(self.params.input).read()
+                self.runs.append(data)
+                if len(self.runs) == 1:
+                    threading.Timer(0.1,
+                        lambda: open(path, 'a').write("b")).start()
+                else:
+                    raise KeyboardInterrupt
+                return len(data)
+
+        status, app = self.runapp(Test, "test --watch %s" % path, watch=False)
+        self.assertEqual(Test.runs, ["a", "ab"])
+        self.assertEqual(status, 1)
+        self.assertFalse(app.watching)
+
+    def test_watch_error(self):
+        path = self.input
+        class Test(CommandLineApp):
+            runs = []
+
+            def setup(self):
+                CommandLineApp.setup(self)
+                self.add_param("input", input=True)
+
+            def main(self):
+                self.runs.append(open(self.params.input).read())
+                if len(self.runs) == 1:
+                    threading.Timer(0.1,
+                        lambda: open(path, 'a').write("b")).start()
+                    raise ValueError("oops")
+                raise KeyboardInterrupt
+
+        status, app = self.runapp(Test, "test --watch %s" % path, watch=False,
+            stderr=StringIO())
+        self.assertEqual(Test.runs, ["a", "ab"])
+        self.assertEqual(status, 1)
+        self.assertTrue("ValueError: oops" in app.stderr.getvalue())
+
+    def test_nothing_to_watch(self):
+        status, app = self.runapp(CommandLineApp, "test", watch=True,
+            main=lambda app: 2, name="test", stderr=StringIO())
+        self.assertEqual(status, 2)
+        self.assertEqual(app.stderr.getvalue(), "test: nothing to watch\n")
@@ -16,10 +16,9 @@ OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 
 """
 
+import os
 import sys
 
-from cli.profiler import Stats, fmtsec, update_wrapper
-
 try:
     import io
     BaseStringIO = io.StringIO
@@ -86,3 +85,37 @@ def ismethodof(method, obj):
     mainobj = getattr(method, "im_self",
         getattr(method, "__self__", None))
     return isinstance(mainobj, cls)
+
+def fingerprint(path, content=True):
+    """Return a tuple that changes when the file at *path* changes.
+
+    The tuple contains the file's size and modification time and, if
+    *content* is True, the SHA-1 digest of its contents. If *path* does
+    not exist, ``None`` is returned.
+
+    .. versionadded:: 1.1.2
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    result = (st.st_size, st.st_mtime)
+    if content and not os.path.isdir(path):
+        import hashlib
+        digest = hashlib.sha1()
+        f = open(path, 'rb')
+        try:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(chunk)
+        finally:
+            f.close()
+        result += (digest.hexdigest(),)
+    return result
+
+def digest(obj):
+    """Return the SHA-1 hex digest of *obj*'s :func:`repr`.
+
+    .. versionadded:: 1.1.2
+    """
+    import hashlib
+    return hashlib.sha1(repr(obj).encode("utf-8")).hexdigest()
@@ -0,0 +1,237 @@
+"""\
+:mod:`cli.watch` -- waiting for files to change
+-----------------------------------------------
+
+While developing an application (or the files it reads), it is common to
+run it again after every edit. A :class:`Watcher` waits for a set of
+files and directories to change so that the application can rerun
+itself in the same, already warm, process (see the *watch* argument to
+:class:`cli.app.Application`).
+
+.. versionadded:: 1.1.2
+"""
+
+__license__ = """Copyright (c) 2008-2010 Will Maier <will@m.aier.us>
+
+Permission to use, copy, modify, and distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""
+
+import os
+import select
+import struct
+import sys
+import time
+
+from cli.util import fingerprint
+
+try:
+    from time import perf_counter as timer
+except ImportError:
+    from time import time as timer
+
+__all__ = ["InotifyWatcher", "Watcher", "watcher"]
+
+class Watcher(object):
+    """Wait for changes to *paths* by polling them.
+
+    *paths* is a sequence of file and directory names. A file changes
+    when its size or modification time changes, or when it is created or
+    removed; a directory changes when one of the entries directly inside
+    it does.
+
+    *interval* is the number of seconds between polls.
+
+    *debounce* is the number of seconds that must pass without further
+    changes before :meth:`wait` returns, so that a burst of changes (an
+    editor saving several files, for example) causes only one rerun.
+
+    Changes to the files named in *ignore* (like the application's own
+    output files) don't count as changes to the directories that
+    contain them.
+    """
+
+    def __init__(self, paths, interval=0.5, debounce=0.1, ignore=()):
+        self.paths = list(paths)
+        self.interval = interval
+        self.debounce = debounce
+        self.ignore = set(os.path.abspath(path) for path in ignore)
+        self.snapshot = self.scan()
+
+    def ignored(self, directory, name):
+        """Return True if changes to *name* in *directory* don't count."""
+        return os.path.abspath(os.path.join(directory, name)) in self.ignore
+
+    def state(self, path):
+        if not os.path.isdir(path):
+            return fingerprint(path, False)
+        try:
+            names = sorted(os.listdir(path))
+        except OSError: # pragma: no cover
+            return None
+        return [(name, fingerprint(os.path.join(path, name), False))
+            for name in names if not self.ignored(path, name)]
+
+    def scan(self):
+        return dict((path, self.state(path)) for path in self.paths)
+
+    def changes(self, timeout=None):
+        """Return the set of paths that change within *timeout* seconds.
+
+        If *timeout* is ``None``, wait until something changes.
+        """
+        deadline = timeout is not None and timer() + timeout or None
+        while True:
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, max(deadline - timer(), 0))
+            time.sleep(delay)
+            snapshot = self.scan()
+            changed = set(path for path in self.paths
+                if snapshot[path] != self.snapshot[path])
+            self.snapshot = snapshot
+            if changed or (deadline is not None and timer() >= deadline):
+                return changed
+
+    def wait(self, timeout=None):
+        """Wait for a burst of changes to end; return the paths that changed.
+
+        If nothing changes within *timeout* seconds, return an empty list.
+        """
+        changed = self.changes(timeout)
+        if changed:
+            while True:
+                more = self.changes(self.debounce)
+                if not more:
+                    break
+                changed.update(more)
+        return sorted(changed)
+
+    def close(self):
+        pass
+
+class InotifyWatcher(Watcher):
+    """Wait for changes to *paths* using Linux's inotify interface.
+
+    Instead of polling, the kernel reports changes as they happen.
+    Files are watched through the directories that contain them, so that
+    editors that replace a file (rather than rewriting it) are noticed,
+    too. Arguments are the same as for :class:`Watcher`; *interval* is
+    not used.
+
+    If inotify is not available, the constructor raises :exc:`OSError`.
+    """
+    mask = (0x00000002 | # IN_MODIFY
+        0x00000004 | # IN_ATTRIB
+        0x00000008 | # IN_CLOSE_WRITE
+        0x00000040 | # IN_MOVED_FROM
+        0x00000080 | # IN_MOVED_TO
+        0x00000100 | # IN_CREATE
+        0x00000200 | # IN_DELETE
+        0x00000400 | # IN_DELETE_SELF
+        0x00000800) # IN_MOVE_SELF
+    overflow = 0x00004000 # IN_Q_OVERFLOW
+    header = struct.Struct("iIII")
+
+    def __init__(self, paths, interval=0.5, debounce=0.1, ignore=()):
+        import ctypes
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(libc, "inotify_init"): # pragma: no cover
+            raise OSError("inotify is not available")
+
+        self.paths = list(paths)
+        self.interval = interval
+        self.debounce = debounce
+        self.ignore = set(os.path.abspath(path) for path in ignore)
+        self.fd = libc.inotify_init()
+        if self.fd < 0: # pragma: no cover
+            raise OSError(ctypes.get_errno(), "inotify_init failed")
+
+        # Map each watch descriptor to its directory and the names in it
+        # that are being watched (or None for the whole directory).
+        self.watches = {}
+        encoding = sys.getfilesystemencoding()
+        try:
+            for path in self.paths:
+                if os.path.isdir(path):
+                    directory, name = path, None
+                else:
+                    directory, name = os.path.split(path)
+                    directory = directory or os.curdir
+                if not isinstance(directory, bytes):
+                    directory = directory.encode(encoding)
+                wd = libc.inotify_add_watch(self.fd, directory, self.mask)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(),
+                        "cannot watch %s" % path)
+                names = self.watches.setdefault(wd, {})
+                if name is None:
+                    names[None] = path
+                else:
+                    names[name] = path
+        except:
+            self.close()
+            raise
+
+    def changes(self, timeout=None):
+        deadline = timeout is not None and timer() + timeout or None
+        while True:
+            if deadline is not None:
+                timeout = max(deadline - timer(), 0)
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+            if not readable:
+                return set()
+            changed = self.read()
+            if changed:
+                return changed
+
+    def read(self):
+        """Read pending events and return the set of paths they affect."""
+        data = os.read(self.fd, 64 * 1024)
+        encoding = sys.getfilesystemencoding()
+        changed = set()
+        offset = 0
+        size = self.header.size
+        while offset < len(data):
+            wd, mask, cookie, length = self.header.unpack_from(data, offset)
+            name = data[offset + size:offset + size + length].rstrip(b'\0')
+            offset += size + length
+            if mask & self.overflow:
+                # The kernel dropped events; assume everything changed.
+                return set(self.paths)
+            names = self.watches.get(wd, {})
+            if not isinstance(name, str):
+                name = name.decode(encoding)
+            if None in names and \
+                    not (name and self.ignored(names[None], name)):
+                changed.add(names[None])
+            if name in names:
+                changed.add(names[name])
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+def watcher(paths, **kwargs):
+    """Return an :class:`InotifyWatcher` if possible, or a :class:`Watcher`.
+
+    Arguments are passed to the constructor.
+    """
+    try:
+        return InotifyWatcher(paths, **kwargs)
+    except OSError:
+        return Watcher(paths, **kwargs)
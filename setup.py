@@ -35,6 +35,8 @@ setup_options = {
     "install_requires": pkg.__requires__,
     "entry_points": """
         # -*- Entry points: -*-
+        [console_scripts]
+        cli-decode-log = cli.log:decode_main
     """,
     "test_suite": "cli.tests",
     "cmdclass": { "build_py": build_py },